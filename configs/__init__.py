@@ -1,6 +1,8 @@
-from configs.dev import DB_CONFIG, TABLES_CONFIG
-from configs.logger import configure_logger
+from configs.dev import DB_CONFIG, LOG_CONFIG, RUN_CONFIG, TABLES_CONFIG
+from configs.logger import configure_logger, configure_worker_logger, log_queue
+from configs.table_config import TableConfig, validate_table_config
 
-configure_logger()
-
-__all__ = ['TABLES_CONFIG', 'DB_CONFIG']
\ No newline at end of file
+__all__ = [
+    'TABLES_CONFIG', 'DB_CONFIG', 'RUN_CONFIG', 'LOG_CONFIG', 'TableConfig',
+    'configure_logger', 'configure_worker_logger', 'log_queue', 'validate_table_config'
+]
\ No newline at end of file
@@ -1,6 +1,9 @@
+from configs.table_config import TableConfig
+
 TABLES_CONFIG = {
     'Example Table': {
         'name': 'EXAMPLE_TABLE',
+        'tags': ['daily'],
         'exp_pks': ['pk1', 'pk2'],
         'sql_path': 'sql/example_table.sql',
         'post_process': {
@@ -11,15 +14,56 @@ TABLES_CONFIG = {
                 'id_col': 'ENTITY_ID'
             }
         },
+        'profile': {
+            'date_cols': ['START_DATE', 'END_DATE'],
+            'duplicate_sample': 10
+        },
+        # DISTRIBUTE ON defaults to the post process id_col
+        'ddl': {
+            'organize_on': ['START_DATE', 'END_DATE'],
+        },
         'custom_tests': ['src.validation.tests.test_example'],
     }
 }
 
-TABLES_CONFIG = {
-    table: {**config, 'sql': open(config['sql_path'], 'r').read()}
-    for table, config in TABLES_CONFIG.items()
-}
+# SQL is read from sql_path on first access, see TableConfig
+TABLES_CONFIG = {table: TableConfig(config) for table, config in TABLES_CONFIG.items()}
 
 DB_CONFIG = {
-    'dsn': 'DSN_EXAMPLE'
-}
\ No newline at end of file
+    # 'netezza', or 'sqlite' / 'duckdb' to run against a local file in 'database'
+    'backend': 'netezza',
+    'dsn': 'DSN_EXAMPLE',
+    'pool_size': 4,
+    'pool_max_uses': 100,
+    # Seconds to wait for a free pooled connection before failing
+    'pool_timeout': 900,
+    # CSV part files db_write formats in parallel and loads together, see csv_write_parts
+    'write_parts': 1
+}
+
+RUN_CONFIG = {
+    # Skip tables whose SQL, post processing and upstream data are unchanged
+    'incremental': False,
+    'fingerprint_path': 'state/fingerprints.json',
+    # Custom tests of a table run concurrently on up to this many connections
+    'custom_test_workers': 4,
+    # Seconds before a custom test is reported as failed (None to disable)
+    'custom_test_timeout': 600,
+    # Per table and stage timings, rows, bytes and peak RSS (None to skip)
+    'metrics_json': 'logs/pipeline_metrics.json',
+    'metrics_prometheus': 'logs/pipeline_metrics.prom',
+    # Parquet cache of db_get results for reruns, e.g.
+    # {'directory': 'state/query_cache', 'max_gb': 20, 'probes': {'SCHEMA.TABLE': 'SELECT MAX(UPDATED_AT) FROM SCHEMA.TABLE'}}
+    'query_cache': None
+}
+
+LOG_CONFIG = {
+    'level': 'DEBUG',
+    'console_level': 'DEBUG',
+    # Quieter modules, e.g. {'src.utils': 'INFO'}
+    'levels': {},
+    # Also write etl_<timestamp>.jsonl with the table and stage of every record
+    'json': False,
+    # Per call site limit of DEBUG records (None to keep all)
+    'rate_limit': {'rate': 10, 'burst': 50}
+}
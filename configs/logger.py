@@ -1,5 +1,11 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing
 import os
+import threading
+import time
 from datetime import datetime
 
 from colorama import Fore, Style, init
@@ -30,28 +36,185 @@ class CustomFormatter(logging.Formatter):
     def format(self, record):
         '''
         Must format message without changing the original records message
-        since other handlers with their own formatters will also be using it
+        since other handlers with their own formatters will also be using it,
+        possibly at the same time, so the colors go on a copy of the record
         '''
-        original_msg = record.msg
-        
         color = self.COLORS.get(record.levelno, self.RESET)
-        record.msg = f"{color}{original_msg}{self.RESET}"
-        formatted_record = super().format(record)
+        colored = logging.makeLogRecord(record.__dict__)
+        colored.msg = f"{color}{record.getMessage()}{self.RESET}"
+        colored.args = None
+        return super().format(colored)
 
-        record.msg = original_msg
+class JsonFormatter(logging.Formatter):
+    '''
+    One JSON object per line, with the table and stage the record was
+    logged from (see ContextFilter) next to the usual fields.
+    '''
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "table": getattr(record, "table", None),
+            "stage": getattr(record, "stage", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class ContextFilter(logging.Filter):
+    '''
+    Adds the table and stage of the logging thread to every record, from
+    context, a callable returning {'table': ..., 'stage': ...}.
+    Runs in the logging thread, before the record is queued.
+    '''
+    def __init__(self, context=None):
+        super().__init__()
+        self.context = context
+
+    def filter(self, record):
+        fields = self.context() if self.context is not None else {}
+        record.table = fields.get("table")
+        record.stage = fields.get("stage")
+        return True
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Token bucket per call site (logger, file and line) for DEBUG records: a
+    call site may log burst records at once and rate per second after that.
+    INFO, SUCCESS and above always get through. loggers limits the filter to
+    those loggers and their children, e.g. ['src.utils'], instead of all.
+
+    Dropped records are counted and reported on the next record of the same
+    call site that gets through, or by summarize() for the call sites that
+    never log again.
+    '''
+    def __init__(self, rate=10.0, burst=50, loggers=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.loggers = tuple(loggers) if loggers else None
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _limited(self, record):
+        if record.levelno > logging.DEBUG:
+            return False
+        if self.loggers is None:
+            return True
+        return any(record.name == name or record.name.startswith(f"{name}.") for name in self.loggers)
+
+    def filter(self, record):
+        if not self._limited(record):
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+
+        record.suppressed = suppressed
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+    def summarize(self):
+        '''
+        Log how many records were dropped at every call site that has not
+        reported its count yet, and reset those counts.
+        '''
+        with self._lock:
+            pending = [(key, suppressed) for key, (_, _, suppressed) in self._buckets.items() if suppressed]
+            for key, _ in pending:
+                tokens, last, _ = self._buckets[key]
+                self._buckets[key] = (tokens, last, 0)
+
+        for (name, pathname, lineno), suppressed in pending:
+            logging.getLogger(name).info(
+                f"{suppressed} DEBUG messages suppressed from {os.path.basename(pathname)}:{lineno}",
+                extra={"suppressed": suppressed},
+            )
 
-        return formatted_record
+_LISTENER = None
+_QUEUE = None
+_RATE_LIMIT = None
 
-def configure_logger(log_dir="logs"):
-    ''''
+def log_queue():
+    '''
+    Queue the configured loggers write to, None before configure_logger.
+    '''
+    return _QUEUE
+
+def configure_worker_logger(queue=None):
+    '''
+    Process pool initializer: send the worker's records to the parent's
+    listener through queue (log_queue() of the parent), e.g.
+        ProcessPoolExecutor(initializer=configure_worker_logger, initargs=(log_queue(),))
+    Without a queue the worker keeps the logging it inherited.
+    '''
+    if queue is None:
+        return
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(queue))
+    root_logger.setLevel(logging.DEBUG)
+
+def stop_logger():
+    '''
+    Write out the queued records and stop the background writer, after
+    logging what the rate limit suppressed.
+    '''
+    global _LISTENER, _RATE_LIMIT
+    if _RATE_LIMIT is not None:
+        _RATE_LIMIT.summarize()
+        _RATE_LIMIT = None
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+def configure_logger(log_dir="logs", config=None, context=None):
+    '''
     Configures the root logger for the application.
+
+    Loggers only put records on a queue; a background QueueListener formats
+    and writes them to the console and the log file, so logging never blocks
+    on I/O. The queue is a multiprocessing queue, so process pool workers can
+    log to it too (see configure_worker_logger).
+
+    config (see LOG_CONFIG) may hold:
+        level:         root level, DEBUG by default
+        console_level: minimum level on the console, DEBUG by default
+        levels:        per logger levels, e.g. {'src.utils': 'INFO'}
+        json:          also write JSON lines to etl_<timestamp>.jsonl
+        rate_limit:    {'rate': per second, 'burst': n, 'loggers': [...]} per
+                       call site, for DEBUG records only (see RateLimitFilter),
+                       None to keep every record
+    context is a callable returning the current {'table': ..., 'stage': ...}
+    for the JSON lines.
     '''
+    global _LISTENER, _QUEUE, _RATE_LIMIT
+    config = config or {}
     os.makedirs(log_dir, exist_ok=True)
+    stop_logger()
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     log_file_path = os.path.join(log_dir, f"etl_{timestamp}.log")
 
     console_handler = logging.StreamHandler()
+    console_handler.setLevel(config.get("console_level", logging.DEBUG))
     console_formatter = CustomFormatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
@@ -62,8 +225,30 @@ def configure_logger(log_dir="logs"):
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     file_handler.setFormatter(file_formatter)
+    handlers = [console_handler, file_handler]
+
+    if config.get("json"):
+        json_handler = logging.FileHandler(os.path.join(log_dir, f"etl_{timestamp}.jsonl"), mode="w")
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    _QUEUE = multiprocessing.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(_QUEUE)
+    queue_handler.addFilter(ContextFilter(context))
+    if config.get("rate_limit"):
+        _RATE_LIMIT = RateLimitFilter(**config["rate_limit"])
+        queue_handler.addFilter(_RATE_LIMIT)
+
+    _LISTENER = logging.handlers.QueueListener(_QUEUE, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(stop_logger)
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
\ No newline at end of file
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root_logger.removeHandler(handler)
+    root_logger.setLevel(config.get("level", logging.DEBUG))
+    root_logger.addHandler(queue_handler)
+
+    for name, level in config.get("levels", {}).items():
+        logging.getLogger(name).setLevel(level)
@@ -0,0 +1,51 @@
+import os
+
+DDL_KEYS = {'distribute_on', 'organize_on', 'sized_types', 'preserve'}
+
+
+class TableConfig(dict):
+    """
+    Table config whose 'sql' is read from its 'sql_path' on first access,
+    so importing configs never touches the SQL files.
+    """
+    def __missing__(self, key):
+        if key == 'sql' and 'sql_path' in self:
+            with open(self['sql_path'], 'r') as f:
+                sql = f.read()
+            self['sql'] = sql
+            return sql
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (key == 'sql' and super().__contains__('sql_path'))
+
+
+def validate_table_config(table, config):
+    """
+    Check that a table config can run, raising ValueError on the first problem.
+    Only called for the tables that are about to run.
+    """
+    if 'name' not in config:
+        raise ValueError(f'Table "{table}" has no name')
+    if 'sql' not in config:
+        raise ValueError(f'Table "{table}" has neither sql nor sql_path')
+    if not dict.__contains__(config, 'sql') and not os.path.isfile(config['sql_path']):
+        raise ValueError(f'SQL file of table "{table}" does not exist: {config["sql_path"]}')
+    if 'post_process' in config and '.' not in config['post_process'].get('function', ''):
+        raise ValueError(f'Post process function of table "{table}" must be a dotted path')
+    unknown = set(config.get('ddl', {})) - DDL_KEYS
+    if unknown:
+        raise ValueError(f'Unknown ddl options {sorted(unknown)} of table "{table}", expected {sorted(DDL_KEYS)}')
+    for key in ('distribute_on', 'organize_on'):
+        columns = config.get('ddl', {}).get(key)
+        if isinstance(columns, (list, tuple)) and len(columns) > 4:
+            raise ValueError(f'{key} of table "{table}" takes at most 4 columns')
+    for func_path in config.get('custom_tests', []):
+        if '.' not in func_path:
+            raise ValueError(f'Custom test "{func_path}" of table "{table}" must be a dotted path')
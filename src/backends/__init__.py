@@ -0,0 +1,40 @@
+import pyodbc
+
+"""
+Database backends. DB_CONFIG['backend'] picks how db_conn connects:
+    'netezza' (default) - pyodbc with DB_CONFIG['dsn']
+    'sqlite', 'duckdb'  - embedded database in DB_CONFIG['database'],
+                          emulating the Netezza SQL used by the pipeline
+                          (see src.backends.local)
+"""
+
+
+def connect_netezza(config):
+    return pyodbc.connect(f"DSN={config['dsn']}")
+
+
+def connect_sqlite(config):
+    from src.backends.local import connect_sqlite
+    return connect_sqlite(config.get('database', 'state/local.db'))
+
+
+def connect_duckdb(config):
+    from src.backends.local import connect_duckdb
+    return connect_duckdb(config.get('database', 'state/local.duckdb'))
+
+
+BACKENDS = {
+    'netezza': connect_netezza,
+    'sqlite': connect_sqlite,
+    'duckdb': connect_duckdb,
+}
+
+
+def connect(config):
+    """
+    Open a connection with the backend named in config['backend'].
+    """
+    backend = config.get('backend', 'netezza')
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown database backend "{backend}", expected one of {sorted(BACKENDS)}')
+    return BACKENDS[backend](config)
@@ -0,0 +1,346 @@
+import csv
+import logging
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from itertools import islice
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+"""
+Embedded SQLite / DuckDB stand-ins for Netezza, so the whole pipeline can
+run and be profiled without the appliance.
+
+Only the small Netezza surface the pipeline uses is emulated:
+    - DROP TABLE <name> IF EXISTS
+    - DISTRIBUTE ON / ORGANIZE ON clauses (dropped)
+    - CREATE EXTERNAL TABLE ... USING (DATAOBJECT ('<csv>') DELIMITER ','
+      SKIPROWS n ...), loaded from the CSV file or pipe into a temp table
+    - INFORMATION_SCHEMA.TABLES / COLUMNS, _V_TABLE (TABLENAME, RELTUPLES,
+      OBJID, CREATEDATE), where SQLite's OBJID is the schema version, so it
+      changes for every table when any is created, and CREATEDATE is NULL,
+      _V_RELATION_COLUMN (NAME, ATTNAME, FORMAT_TYPE, ATTNUM) and an empty
+      _V_TABLE_DIST_MAP (TABLENAME, ATTNAME, DISTSEQNO)
+    - several statements separated by ';' in one execute
+    - with conn.cursor() as cursor: ... committing on exit, like pyodbc
+
+Cursors describe their columns with python types the way pyodbc does, and
+ISO formatted date / timestamp strings (SQLite has no date type) come back
+as date / datetime. Date arithmetic like "end_date - 1" is not translated,
+so the 'sql' interval engine only runs on DuckDB.
+"""
+
+_DROP_IF_EXISTS = re.compile(r'\bDROP\s+TABLE\s+([\w.]+)\s+IF\s+EXISTS\b', re.IGNORECASE)
+_DISTRIBUTE = re.compile(r'\b(?:DISTRIBUTE|ORGANIZE)\s+ON\s+(?:RANDOM\b|\([^)]*\))', re.IGNORECASE)
+_EXTERNAL = re.compile(
+    r'^\s*CREATE\s+EXTERNAL\s+TABLE\s+([\w.]+)\s*\((.*?)\)\s*USING\s*\((.*)\)\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+_EXTERNAL_OPTION = re.compile(r"(\w+)\s+(?:\(\s*'([^']*)'\s*\)|'([^']*)'|(\w+))")
+_COLUMN_SEP = re.compile(r',(?![^()]*\))')
+_CATALOG = re.compile(r'\bINFORMATION_SCHEMA\.|\b_V_TABLE\b|\b_V_RELATION_COLUMN\b', re.IGNORECASE)
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_ISO_DATETIME = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?')
+
+_LOAD_BATCH = 10_000
+
+
+def split_statements(sql):
+    """
+    Split sql on the ';' outside of string literals, dropping empty statements.
+    """
+    statements, current, quoted = [], [], False
+    for char in sql:
+        if char == "'":
+            quoted = not quoted
+        if char == ';' and not quoted:
+            statements.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    statements.append(''.join(current))
+    return [s for s in statements if s.strip()]
+
+
+def translate(sql):
+    """
+    Rewrite the Netezza specific clauses of one statement.
+    """
+    sql = _DROP_IF_EXISTS.sub(r'DROP TABLE IF EXISTS \1', sql)
+    return _DISTRIBUTE.sub('', sql)
+
+
+def _parse_value(value, col_type):
+    if value == '':
+        return None
+    if col_type.startswith(('INT', 'BIGINT', 'SMALLINT', 'BYTEINT')):
+        try:
+            return int(value)
+        except ValueError:
+            return int(float(value))
+    if col_type.startswith(('FLOAT', 'DOUBLE', 'REAL', 'NUMERIC', 'DECIMAL')):
+        return float(value)
+    return value
+
+
+def _convert_column(values):
+    """
+    Python type of a fetched column and its values, turning ISO date and
+    timestamp strings into date / datetime.
+    """
+    sample = next((val for val in values if val is not None), None)
+    if sample is None:
+        return str, values
+    if isinstance(sample, str):
+        present = [val for val in values if val is not None]
+        if all(_ISO_DATE.fullmatch(val) for val in present):
+            return date, [None if val is None else date.fromisoformat(val) for val in values]
+        if all(_ISO_DATETIME.fullmatch(val) for val in present):
+            return datetime, [None if val is None else datetime.fromisoformat(val) for val in values]
+    return type(sample), values
+
+
+class LocalCursor:
+    """
+    pyodbc style cursor over an embedded database connection.
+    Results are fetched eagerly so they can be described and converted.
+    """
+    def __init__(self, connection):
+        self._connection = connection
+        self._raw = connection._new_raw_cursor()
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+        self._pos = 0
+
+    def execute(self, sql, params=()):
+        self.description, self._rows, self._pos = None, [], 0
+        for statement in split_statements(sql):
+            self._execute_one(statement, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._raw.executemany(translate(sql), seq_of_params)
+        self.rowcount = getattr(self._raw, 'rowcount', -1)
+
+    def _execute_one(self, statement, params):
+        external = _EXTERNAL.match(statement)
+        if external:
+            self.rowcount = self._connection._load_external(*external.groups())
+            return
+
+        statement = translate(statement)
+        if _CATALOG.search(statement):
+            self._connection._refresh_catalog()
+
+        self._raw.execute(statement, params)
+        self.rowcount = getattr(self._raw, 'rowcount', -1)
+        if self._raw.description is None:
+            return
+
+        names = [column[0] for column in self._raw.description]
+        rows = self._raw.fetchall()
+        columns = [_convert_column(list(values)) for values in zip(*rows)] if rows else [(str, [])] * len(names)
+        self.description = [
+            (name, type_code, None, None, None, None, True)
+            for name, (type_code, _) in zip(names, columns)
+        ]
+        self._rows = list(zip(*(values for _, values in columns))) if rows else []
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def close(self):
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._connection.commit()
+        self.close()
+
+
+class LocalConnection:
+    """
+    pyodbc style connection to an embedded database.
+    """
+    timeout = 0
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self):
+        return LocalCursor(self)
+
+    def _new_raw_cursor(self):
+        return self._raw.cursor()
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def _load_external(self, table_name, columns_sql, options_sql):
+        """
+        Create table_name as a temp table and fill it from the CSV file (or
+        pipe) in its DATAOBJECT option. Returns the number of rows loaded.
+        """
+        options = {}
+        for key, quoted, literal, word in _EXTERNAL_OPTION.findall(options_sql):
+            options[key.upper()] = quoted or literal or word
+
+        columns = [col.split(None, 1) for col in _COLUMN_SEP.split(columns_sql) if col.strip()]
+        types = [col_type.strip().upper() for _, col_type in columns]
+        # The temp table must be created on the connection the INSERT runs on
+        cursor = self._new_raw_cursor()
+        cursor.execute(f'DROP TABLE IF EXISTS {table_name}')
+        cursor.execute(f'CREATE TEMP TABLE {table_name} ({columns_sql})')
+
+        insert = f'INSERT INTO {table_name} VALUES ({", ".join("?" * len(columns))})'
+        loaded = 0
+        with open(options['DATAOBJECT'], newline='') as f:
+            reader = csv.reader(f, delimiter=options.get('DELIMITER', ','))
+            for _ in range(int(options.get('SKIPROWS', 0))):
+                next(reader, None)
+            while True:
+                batch = [
+                    [_parse_value(value, col_type) for value, col_type in zip(row, types)]
+                    for row in islice(reader, _LOAD_BATCH)
+                ]
+                if not batch:
+                    break
+                cursor.executemany(insert, batch)
+                loaded += len(batch)
+
+        logger.debug(f'Loaded {loaded} rows into external table {table_name}')
+        return loaded
+
+    def _refresh_catalog(self):
+        pass
+
+
+class SqliteConnection(LocalConnection):
+    """
+    SQLite connection with an INFORMATION_SCHEMA database and _V_ temp
+    tables, refreshed from sqlite_master before every catalog query.
+    """
+    def __init__(self, raw):
+        super().__init__(raw)
+        raw.execute("ATTACH DATABASE ':memory:' AS INFORMATION_SCHEMA")
+        raw.execute('CREATE TABLE INFORMATION_SCHEMA.TABLES (TABLE_NAME TEXT)')
+        raw.execute(
+            'CREATE TABLE INFORMATION_SCHEMA.COLUMNS '
+            '(TABLE_NAME TEXT, COLUMN_NAME TEXT, ORDINAL_POSITION INT, DATA_TYPE TEXT)'
+        )
+        raw.execute('CREATE TEMP TABLE _V_TABLE (TABLENAME TEXT, RELTUPLES INT, OBJID INT, CREATEDATE TIMESTAMP)')
+        raw.execute('CREATE TEMP TABLE _V_RELATION_COLUMN (NAME TEXT, ATTNAME TEXT, FORMAT_TYPE TEXT, ATTNUM INT)')
+        raw.execute('CREATE TEMP TABLE _V_TABLE_DIST_MAP (TABLENAME TEXT, ATTNAME TEXT, DISTSEQNO INT)')
+
+    def _refresh_catalog(self):
+        cursor = self._raw.cursor()
+        for table in ('INFORMATION_SCHEMA.TABLES', 'INFORMATION_SCHEMA.COLUMNS', 'temp._V_TABLE',
+                      'temp._V_RELATION_COLUMN'):
+            cursor.execute(f'DELETE FROM {table}')
+
+        # No per table object ids: the schema version changes with every CREATE / DROP
+        version = cursor.execute('PRAGMA main.schema_version').fetchone()[0]
+        tables = [row[0] for row in cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            cursor.execute('INSERT INTO INFORMATION_SCHEMA.TABLES VALUES (?)', (table,))
+            columns = cursor.execute(f'PRAGMA main.table_info("{table}")').fetchall()
+            cursor.executemany(
+                'INSERT INTO INFORMATION_SCHEMA.COLUMNS VALUES (?, ?, ?, ?)',
+                [(table, name, cid + 1, col_type) for cid, name, col_type, *_ in columns]
+            )
+            cursor.executemany(
+                'INSERT INTO temp._V_RELATION_COLUMN VALUES (?, ?, ?, ?)',
+                [(table, name, col_type, cid + 1) for cid, name, col_type, *_ in columns]
+            )
+            row_count = cursor.execute(f'SELECT COUNT(*) FROM main."{table}"').fetchone()[0]
+            cursor.execute('INSERT INTO temp._V_TABLE VALUES (?, ?, ?, NULL)', (table, row_count, version))
+
+
+class DuckdbConnection(LocalConnection):
+    """
+    DuckDB connection. INFORMATION_SCHEMA is native, the _V_ catalog tables are views.
+    Statements run on the connection itself, in a transaction that lasts until
+    commit / rollback like with pyodbc, so commit covers them.
+    """
+    def __init__(self, raw):
+        super().__init__(raw)
+        self._in_transaction = False
+        raw.execute(
+            'CREATE OR REPLACE TEMP VIEW _V_TABLE AS '
+            'SELECT table_name AS TABLENAME, estimated_size AS RELTUPLES, table_oid AS OBJID, '
+            'NULL::TIMESTAMP AS CREATEDATE FROM duckdb_tables()'
+        )
+        raw.execute(
+            'CREATE OR REPLACE TEMP VIEW _V_RELATION_COLUMN AS '
+            'SELECT table_name AS NAME, column_name AS ATTNAME, data_type AS FORMAT_TYPE, '
+            'ordinal_position AS ATTNUM FROM information_schema.columns'
+        )
+        raw.execute(
+            'CREATE OR REPLACE TEMP VIEW _V_TABLE_DIST_MAP AS '
+            'SELECT NULL::VARCHAR AS TABLENAME, NULL::VARCHAR AS ATTNAME, NULL::INTEGER AS DISTSEQNO WHERE FALSE'
+        )
+
+    def _new_raw_cursor(self):
+        if not self._in_transaction:
+            self._raw.begin()
+            self._in_transaction = True
+        return self._raw
+
+    def commit(self):
+        self._in_transaction = False
+        try:
+            self._raw.commit()
+        except duckdb.TransactionException:
+            pass
+
+    def rollback(self):
+        self._in_transaction = False
+        try:
+            self._raw.rollback()
+        except duckdb.TransactionException:
+            pass
+
+
+def connect_sqlite(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    raw = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    raw.execute('PRAGMA journal_mode=WAL')
+    return SqliteConnection(raw)
+
+
+def connect_duckdb(path):
+    if duckdb is None:
+        raise ImportError('The duckdb backend requires the duckdb package')
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return DuckdbConnection(duckdb.connect(path))
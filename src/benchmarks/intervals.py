@@ -0,0 +1,260 @@
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from src.post_processing.standardize_date_intervals import (
+    INTERVAL_ENGINES, priority_latest_start, process_intervals_parallel, process_intervals_singlethread
+)
+
+logger = logging.getLogger(__name__)
+
+"""
+Offline benchmark of the interval standardization engines.
+
+Times process_intervals_singlethread on synthetic data for every combination
+of scale and engine, and checks every engine's output against a baseline
+engine. 'parallel-<engine>' runs <engine> through process_intervals_parallel
+on --workers processes instead. No database connection is needed:
+
+    python -m src.benchmarks.intervals --ids 100 1000 --per-id 20 --engines scan sweep batch parallel-batch
+"""
+
+ID_COL, SDT_COL, NDT_COL = 'ENTITY_ID', 'START_DATE', 'END_DATE'
+
+# Engines that replay every intermediate trim in their statuses
+PER_ID_ENGINES = {'scan', 'sweep'}
+
+ENGINES = list(INTERVAL_ENGINES) + ['batch']
+PARALLEL_PREFIX = 'parallel-'
+
+BASE_DATE = '2000-01-01'
+
+
+def generate_intervals(n_ids, per_id, overlap=0.5, subsumed=0.1, payload_cols=2, max_length=60, seed=0):
+    """
+    Synthetic table of date intervals.
+
+    Every ID gets a chain of per_id intervals where each interval overlaps its
+    predecessor with probability overlap and otherwise follows it after a gap.
+    On top of that, about subsumed * n_ids * per_id extra intervals are added
+    that end up fully covered by later starting intervals, i.e. 'Removed
+    (Fully Subsumed)'. payload_cols float columns ride along.
+    Rows are returned in random order.
+
+    The dates are second resolution timestamps, so even chains of many
+    thousands of intervals per ID do not overflow them.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_ids * per_id
+
+    ids = np.repeat(np.arange(n_ids), per_id)
+    first = np.zeros(n, dtype=bool)
+    first[::per_id] = True
+
+    lengths = rng.integers(2, max_length + 1, n)
+    overlaps = rng.random(n) < overlap
+    overlaps[first] = False
+
+    # Offset of each start from the previous end: negative overlaps it
+    prev_lengths = np.r_[0, lengths[:-1]]
+    step = np.where(
+        overlaps,
+        -(rng.random(n) * (prev_lengths - 1)).astype(np.int64) - 1,
+        rng.integers(0, max_length, n),
+    )
+    step[first] = rng.integers(0, 365, n_ids)
+    step += prev_lengths
+    step[first] += -prev_lengths[first]
+
+    # Cumulative sum restarting at every ID
+    starts = np.cumsum(step)
+    starts -= np.repeat(starts[first] - step[first], per_id)
+    ends = starts + lengths
+
+    # Extra intervals sharing a start with an interval and reaching into the
+    # next, overlapping one: covered by the two of them together
+    nxt = np.flatnonzero(~first)
+    host = nxt - 1
+    host = host[overlaps[nxt] & (ends[nxt] > ends[host])]
+    host = np.sort(rng.choice(host, min(len(host), round(subsumed * n)), replace=False))
+    extra_ends = ends[host] + 1 + (rng.random(len(host)) * (ends[host + 1] - ends[host])).astype(np.int64)
+
+    ids = np.r_[ids, ids[host]]
+    starts = np.r_[starts, starts[host]]
+    ends = np.r_[ends, extra_ends]
+
+    base = np.datetime64(BASE_DATE, 'D')
+    df = pd.DataFrame({
+        ID_COL: ids,
+        SDT_COL: (base + starts).astype('datetime64[s]'),
+        NDT_COL: (base + ends).astype('datetime64[s]'),
+    })
+    for i in range(payload_cols):
+        df[f'PAYLOAD_{i}'] = rng.random(len(df))
+
+    return df.take(rng.permutation(len(df))).reset_index(drop=True)
+
+
+def _canonical(final_df, columns):
+    """
+    Engine output in a comparable form: baseline column order, sorted rows.
+    """
+    out = final_df[columns]
+    return out.sort_values([c for c in columns if c != 'priority']).reset_index(drop=True)
+
+
+def compare_results(expected, actual, compare_statuses=True):
+    """
+    Return None when actual matches expected, else a description of the
+    first difference. Both are (final_df, statuses) as returned by
+    process_intervals_singlethread.
+    """
+    expected_df, expected_statuses = expected
+    actual_df, actual_statuses = actual
+
+    columns = [ID_COL, SDT_COL, NDT_COL] + [c for c in expected_df.columns if c not in (ID_COL, SDT_COL, NDT_COL)]
+    if set(columns) != set(actual_df.columns):
+        return f'columns differ: {sorted(expected_df.columns)} != {sorted(actual_df.columns)}'
+    if len(expected_df) != len(actual_df):
+        return f'{len(actual_df)} rows instead of {len(expected_df)}'
+
+    expected_df, actual_df = _canonical(expected_df, columns), _canonical(actual_df, columns)
+    for col in columns:
+        differs = ~((expected_df[col] == actual_df[col]) | (expected_df[col].isna() & actual_df[col].isna()))
+        if differs.any():
+            row = int(np.flatnonzero(differs.to_numpy())[0])
+            return f'{col} differs at row {row}: {expected_df[col].iat[row]!r} != {actual_df[col].iat[row]!r}'
+
+    if compare_statuses and expected_statuses != actual_statuses:
+        ids = [i for i in expected_statuses if expected_statuses[i] != actual_statuses.get(i)]
+        return f'statuses differ for {len(ids)} IDs, e.g. {ids[:5]}'
+    return None
+
+
+def _base_engine(engine):
+    return engine[len(PARALLEL_PREFIX):] if engine.startswith(PARALLEL_PREFIX) else engine
+
+
+def _run(df, engine, workers=2):
+    if engine.startswith(PARALLEL_PREFIX):
+        return process_intervals_parallel(
+            df, SDT_COL, NDT_COL, ID_COL, priority_latest_start, engine=_base_engine(engine), workers=workers
+        )
+    return process_intervals_singlethread(df, SDT_COL, NDT_COL, ID_COL, priority_latest_start, engine=engine)
+
+
+def benchmark_engine(df, engine, repeat=1, memory=True, workers=2):
+    """
+    Best wall time of repeat runs, and the peak traced memory of one more
+    run when memory is set (tracing slows the engines down, so it is never
+    timed). Returns (result, seconds, peak_bytes).
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _run(df, engine, workers)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _run(df, engine, workers)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def run_benchmarks(n_ids=(100,), per_id=(20,), overlap=(0.5,), subsumed=(0.1,), payload_cols=(2,),
+                   engines=('scan', 'sweep', 'batch'), baseline='scan', repeat=1, memory=True, seed=0,
+                   max_length=(60,), workers=2):
+    """
+    Benchmark every engine on every combination of the generator parameters.
+    Returns one dict per (scale, engine) with rows/sec, peak memory and the
+    parity with the baseline engine ('baseline', 'ok' or the difference).
+    Peak memory of the parallel engines only covers the parent process.
+    """
+    engines = [baseline] + [engine for engine in engines if engine != baseline]
+    results = []
+    for ids, per, ovl, sub, pay, length in product(n_ids, per_id, overlap, subsumed, payload_cols, max_length):
+        df = generate_intervals(ids, per, ovl, sub, pay, length, seed=seed)
+        scale = {
+            'n_ids': ids, 'per_id': per, 'overlap': ovl, 'subsumed': sub, 'payload_cols': pay,
+            'max_length': length, 'rows': len(df),
+        }
+        logger.info(f'Benchmarking {scale}')
+
+        expected = None
+        for engine in engines:
+            result, seconds, peak = benchmark_engine(df, engine, repeat, memory, workers)
+            if expected is None:
+                expected, parity = result, 'baseline'
+            else:
+                compare_statuses = _base_engine(engine) in PER_ID_ENGINES and _base_engine(baseline) in PER_ID_ENGINES
+                parity = compare_results(expected, result, compare_statuses) or 'ok'
+
+            results.append({
+                **scale,
+                'engine': engine,
+                'seconds': round(seconds, 4),
+                'rows_per_sec': round(len(df) / seconds) if seconds else None,
+                'peak_mb': None if peak is None else round(peak / 2**20, 1),
+                'parity': parity,
+            })
+    return results
+
+
+def format_results(results):
+    header = f'{"rows":>10} {"engine":>14} {"seconds":>9} {"rows/sec":>11} {"peak MB":>8}  parity'
+    lines = [header, '-' * len(header)]
+    for r in results:
+        peak = '-' if r['peak_mb'] is None else r['peak_mb']
+        lines.append(
+            f'{r["rows"]:>10} {r["engine"]:>14} {r["seconds"]:>9.3f} {r["rows_per_sec"] or 0:>11,} {peak:>8}  {r["parity"]}'
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the interval standardization engines offline.')
+    parser.add_argument('--ids', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--per-id', type=int, nargs='+', default=[20])
+    parser.add_argument('--overlap', type=float, nargs='+', default=[0.5])
+    parser.add_argument('--subsumed', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--payload', type=int, nargs='+', default=[2])
+    parser.add_argument('--max-length', type=int, nargs='+', default=[60], help='longest interval in days')
+    choices = ENGINES + [PARALLEL_PREFIX + engine for engine in ENGINES]
+    parser.add_argument('--engines', nargs='+', default=['scan', 'sweep', 'batch'], choices=choices)
+    parser.add_argument('--baseline', default='scan', choices=choices)
+    parser.add_argument('--workers', type=int, default=2, help='processes of the parallel-<engine> engines')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced peak memory run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.ids, args.per_id, args.overlap, args.subsumed, args.payload,
+        args.engines, args.baseline, args.repeat, not args.no_memory, args.seed, args.max_length, args.workers
+    )
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    mismatches = [r for r in results if r['parity'] not in ('baseline', 'ok')]
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import instrumentation
+from src.backends import connect
+from src.backends.local import duckdb
+from src.benchmarks.intervals import ID_COL, NDT_COL, SDT_COL, generate_intervals
+from src.main import new_report, run_pipeline
+from src.utils import ConnectionPool, db_get, db_write, load_function, set_pool
+
+logger = logging.getLogger(__name__)
+
+"""
+End-to-end benchmark of the pipeline on an embedded database backend.
+
+For every data size a fresh local database is filled with a synthetic
+BENCH_SOURCE interval table, then a TABLES_CONFIG style pipeline runs
+against it exactly as main would, and the per stage timings recorded by
+src.instrumentation are reported:
+
+    python -m src.benchmarks.pipeline --backend sqlite --ids 1000 10000 --per-id 20
+
+--smoke only checks that a small table survives a db_write / db_get round
+trip on every embedded backend that is installed.
+"""
+
+SOURCE_TABLE = 'BENCH_SOURCE'
+
+
+def bench_tables_config(engine='batch'):
+    """
+    Default pipeline: standardize a copy of the source intervals, then
+    summarize it per ID in a dependent table.
+    """
+    return {
+        'Bench Intervals': {
+            'name': 'BENCH_INTERVALS',
+            'exp_pks': [ID_COL, SDT_COL],
+            'sql': f'CREATE TABLE BENCH_INTERVALS AS SELECT * FROM {SOURCE_TABLE}',
+            'post_process': {
+                'function': 'src.post_processing.standardize_date_intervals.standardize_date_intervals',
+                'params': {'sdt_col': SDT_COL, 'ndt_col': NDT_COL, 'id_col': ID_COL, 'engine': engine}
+            },
+            'profile': {'date_cols': [SDT_COL, NDT_COL]},
+        },
+        'Bench Summary': {
+            'name': 'BENCH_SUMMARY',
+            'exp_pks': [ID_COL],
+            'sql': f"""
+            CREATE TABLE BENCH_SUMMARY AS
+            SELECT {ID_COL}, COUNT(*) AS INTERVALS, MIN({SDT_COL}) AS FIRST_START, MAX({NDT_COL}) AS LAST_END
+            FROM BENCH_INTERVALS
+            GROUP BY {ID_COL}
+            """,
+        },
+    }
+
+
+def _database_path(backend, directory, n_ids, per_id):
+    extension = 'duckdb' if backend == 'duckdb' else 'db'
+    database = os.path.join(directory, f'bench_{n_ids}x{per_id}.{extension}')
+    for path in (database, f'{database}-wal', f'{database}-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    return database
+
+
+def round_trip(backend='sqlite', directory=None, n_ids=20, per_id=5):
+    """
+    Write a small synthetic source table with db_write on a fresh local
+    database and read it back. Returns None when it comes back unchanged,
+    else a description of the difference.
+    """
+    directory = directory or tempfile.mkdtemp(prefix='etl_smoke_')
+    database = _database_path(backend, directory, n_ids, per_id)
+
+    os.makedirs('tmp', exist_ok=True)
+    df = generate_intervals(n_ids, per_id)
+    conn = connect({'backend': backend, 'database': database})
+    try:
+        with instrumentation.table_context(SOURCE_TABLE):
+            db_write(df, SOURCE_TABLE, conn=conn)
+        loaded = db_get(conn, f'SELECT * FROM {SOURCE_TABLE}')
+    finally:
+        conn.close()
+
+    if list(loaded.columns) != list(df.columns) or len(loaded) != len(df):
+        return f'{len(loaded)} rows with {list(loaded.columns)} instead of {len(df)} with {list(df.columns)}'
+    key = [ID_COL, SDT_COL, NDT_COL, 'PAYLOAD_0']
+    expected = df.sort_values(key).reset_index(drop=True)
+    loaded = loaded.sort_values(key).reset_index(drop=True)
+    for col in df.columns:
+        if col in (SDT_COL, NDT_COL):
+            same = (pd.to_datetime(loaded[col]) == expected[col]).all()
+        else:
+            same = np.allclose(loaded[col].astype(float), expected[col].astype(float))
+        if not same:
+            return f'{col} differs after the round trip'
+    return None
+
+
+def _failures(report):
+    return {
+        section: data['failure']
+        for section, data in report.items()
+        if isinstance(data, dict) and data.get('failure')
+    }
+
+
+def run_benchmark(tables_config, n_ids, per_id, backend='sqlite', directory=None, pool_size=4, seed=0, **generator):
+    """
+    Run tables_config on a fresh local database holding n_ids * per_id
+    synthetic source intervals (see generate_intervals for generator).
+    Returns the size, total wall time, per stage summary and any failures.
+    """
+    directory = directory or tempfile.mkdtemp(prefix='etl_bench_')
+    database = _database_path(backend, directory, n_ids, per_id)
+
+    config = {'backend': backend, 'database': database}
+    pool = ConnectionPool(connect=lambda: connect(config), max_size=pool_size)
+    set_pool(pool)
+    instrumentation.reset()
+
+    # db_write keeps a copy of its DDL in tmp/
+    os.makedirs('tmp', exist_ok=True)
+    df = generate_intervals(n_ids, per_id, seed=seed, **generator)
+    start = time.perf_counter()
+    try:
+        with pool.connection() as conn, instrumentation.table_context(SOURCE_TABLE):
+            db_write(df, SOURCE_TABLE, conn=conn)
+
+        report = new_report(tables_config)
+        run_pipeline(report, tables_config, pool)
+    finally:
+        pool.close()
+
+    return {
+        'backend': backend,
+        'n_ids': n_ids,
+        'per_id': per_id,
+        'rows': len(df),
+        'seconds': round(time.perf_counter() - start, 3),
+        'stages': instrumentation.summarize(),
+        'failures': _failures(report),
+    }
+
+
+def format_result(result):
+    lines = [
+        f'{result["rows"]} rows ({result["n_ids"]} IDs x {result["per_id"]}) '
+        f'on {result["backend"]}: {result["seconds"]:.2f}s',
+        f'   {"table":<18} {"stage":<18} {"seconds":>9} {"calls":>6} {"rows":>10} {"MB":>8}',
+    ]
+    for stage in result['stages']:
+        lines.append(
+            f'   {stage["table"] or "-":<18} {stage["stage"]:<18} {stage["seconds"]:>9.3f} '
+            f'{stage["calls"]:>6} {stage["rows"]:>10} {stage["bytes"] / 2**20:>8.1f}'
+        )
+    for section, failures in result['failures'].items():
+        lines.append(f'   FAILED {section}: {failures}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the whole pipeline on a local database backend.')
+    parser.add_argument('--backend', choices=['sqlite', 'duckdb'], default='sqlite')
+    parser.add_argument('--ids', type=int, nargs='+', default=[1000])
+    parser.add_argument('--per-id', type=int, nargs='+', default=[20])
+    parser.add_argument('--engine', default='batch', help='interval engine of the default pipeline')
+    parser.add_argument('--config', help='dotted path to a TABLES_CONFIG style dict reading from BENCH_SOURCE')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--dir', help='directory for the database files (a temp directory by default)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--smoke', action='store_true', help='only check a round trip on every installed backend')
+    args = parser.parse_args(argv)
+
+    if args.smoke:
+        failed = False
+        for backend in ('sqlite', 'duckdb'):
+            if backend == 'duckdb' and duckdb is None:
+                print(f'{backend}: skipped, duckdb is not installed')
+                continue
+            problem = round_trip(backend, args.dir)
+            print(f'{backend}: {problem or "ok"}')
+            failed = failed or problem is not None
+        return 1 if failed else 0
+
+    tables_config = load_function(args.config) if args.config else bench_tables_config(args.engine)
+
+    results = []
+    for n_ids in args.ids:
+        for per_id in args.per_id:
+            result = run_benchmark(
+                tables_config, n_ids, per_id, args.backend, args.dir, args.pool_size, args.seed
+            )
+            print(format_result(result))
+            results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if any(result['failures'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
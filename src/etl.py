@@ -1,7 +1,9 @@
+import inspect
 import logging
 
 from configs import TABLES_CONFIG
-from src.utils import db_exec, load_function
+from src.instrumentation import span
+from src.utils import db_exec, get_query_cache, load_function
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +17,15 @@ class PostProcessingException(Exception):
             
 def process(report, conn, config):
     table_name = config['name']
+    cache = get_query_cache()
+    if cache is not None:
+        # Results cached for an earlier build of the table are stale from here on
+        cache.mark_built(table_name)
     try:
         # Execute the SQL for the table
-        db_exec(conn, f'DROP TABLE {config["name"]} IF EXISTS')
-        db_exec(conn, config['sql'])
+        with span('process') as s:
+            db_exec(conn, f'DROP TABLE {config["name"]} IF EXISTS')
+            s['rows'] = db_exec(conn, config['sql'])
         logger.success(f'Successfully processed table: {table_name}')
         report['executed']['success'].append(table_name)
 
@@ -28,6 +35,13 @@ def process(report, conn, config):
         report['executed']['failure'][table_name] = str(e)
         raise ExecutionException(str(e))
 
+def _accepts(func, name):
+    """
+    True if func can be called with the keyword argument name.
+    """
+    parameters = inspect.signature(func).parameters.values()
+    return any(p.name == name or p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters)
+
 def post_process(report, conn, config):
     table_name = config['name']
 
@@ -37,7 +51,11 @@ def post_process(report, conn, config):
     try:    
         proc = load_function(config['post_process']['function'])
         params = config['post_process'].get('params', {})
-        proc(table_name, conn, **params)
+        if 'ddl' in config and _accepts(proc, 'ddl'):
+            # Distribution / type options for the table the post process rewrites
+            params = {**params, 'ddl': config['ddl']}
+        with span('post_process'):
+            proc(table_name, conn, **params)
 
         logger.success(f'Successfully post processed table: {table_name}')
         report['post_processing']['success'].append(table_name)
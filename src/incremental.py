@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from src.scheduler import referenced_tables
+
+logger = logging.getLogger(__name__)
+
+
+class FingerprintStore:
+    """
+    JSON file recording, per table, the fingerprint of its last successful build.
+
+    A table is invalidated before it is rebuilt and only recorded again once
+    the build succeeded, so a rerun after a failure skips everything that
+    already finished and resumes from the table that failed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+
+    def get(self, table_name):
+        with self._lock:
+            entry = self._entries.get(table_name)
+            return entry['fingerprint'] if entry else None
+
+    def is_current(self, table_name, fingerprint):
+        return self.get(table_name) == fingerprint
+
+    def record(self, table_name, fingerprint):
+        with self._lock:
+            self._entries[table_name] = {'fingerprint': fingerprint, 'built': datetime.now().isoformat()}
+            self._save()
+
+    def invalidate(self, table_name):
+        with self._lock:
+            if self._entries.pop(table_name, None) is not None:
+                self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _probe(conn, sql):
+    with conn.cursor() as cursor:
+        cursor.execute(sql)
+        return [list(row) for row in cursor.fetchall()]
+
+
+def table_fingerprint(conn, config, store, tables_config):
+    """
+    Hash of everything a table's build depends on:
+        - its SQL text and post_process config
+        - its upstream tables: the ones referenced in its SQL and its
+          depends_on entries (config keys or table names)
+        - for upstream tables built by this pipeline, their recorded fingerprint
+          (None is returned while one has none, so the table is rebuilt)
+        - for other upstream tables, a freshness probe: the query configured in
+          config['freshness_probes'][table] or their row count by default
+    """
+    built_here = {c['name'].upper(): c['name'] for c in tables_config.values()}
+    probes = config.get('freshness_probes', {})
+
+    refs = referenced_tables(config['sql'])
+    for dep in config.get('depends_on', []):
+        refs.append(tables_config[dep]['name'] if dep in tables_config else dep)
+
+    upstream = {}
+    for ref in dict.fromkeys(refs):
+        name = ref.rsplit('.', 1)[-1].upper()
+        if name == config['name'].upper():
+            continue
+        if name in built_here:
+            upstream[ref] = store.get(built_here[name])
+            if upstream[ref] is None:
+                return None
+        else:
+            upstream[ref] = _probe(conn, probes.get(ref, f'SELECT COUNT(*) FROM {ref}'))
+
+    payload = {
+        'sql': config['sql'],
+        'post_process': config.get('post_process'),
+        'upstream': upstream,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
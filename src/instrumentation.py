@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+"""
+Stage level instrumentation of a pipeline run.
+
+Every instrumented stage records one span: its stage name, the table it ran
+for, wall time, rows affected, bytes moved and the peak RSS of the process at
+the end of the stage. The table is taken from the innermost table_context, so
+helpers like db_get do not need to know which table they work for.
+"""
+
+_TABLE = ContextVar('instrumentation_table', default=None)
+_STAGE = ContextVar('instrumentation_stage', default=None)
+_SPANS = []
+_LOCK = threading.Lock()
+
+_METRICS = [
+    ('seconds', 'etl_stage_seconds', 'Wall time spent in the stage.'),
+    ('rows', 'etl_stage_rows', 'Rows affected by the stage.'),
+    ('bytes', 'etl_stage_bytes', 'Bytes moved by the stage.'),
+    ('calls', 'etl_stage_calls', 'Number of times the stage ran.'),
+    ('errors', 'etl_stage_errors', 'Number of times the stage failed.'),
+    ('peak_rss', 'etl_stage_peak_rss_bytes', 'Peak resident set size of the process after the stage.'),
+]
+
+
+def peak_rss():
+    """
+    Peak resident set size of the process in bytes, None where unsupported.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+@contextmanager
+def table_context(table_name):
+    """
+    Attribute the spans recorded inside the block to table_name.
+    """
+    token = _TABLE.set(table_name)
+    try:
+        yield
+    finally:
+        _TABLE.reset(token)
+
+
+def current_context():
+    """
+    Table and innermost stage of the running code, e.g. for log records.
+    """
+    return {'table': _TABLE.get(), 'stage': _STAGE.get()}
+
+
+@contextmanager
+def span(stage, table=None, **attrs):
+    """
+    Record a span for the block. Yields the span dict, so the block can fill
+    in 'rows' and 'bytes' once they are known.
+
+        with span('csv_write', rows=len(df)) as s:
+            ...
+            s['bytes'] = os.path.getsize(path)
+    """
+    record = {
+        'stage': stage,
+        'table': table or _TABLE.get(),
+        'started': datetime.now().isoformat(),
+        'rows': None,
+        'bytes': None,
+        **attrs,
+    }
+    start = time.perf_counter()
+    token = _STAGE.set(stage)
+    try:
+        yield record
+        record['status'] = 'success'
+    except BaseException:
+        record['status'] = 'failure'
+        raise
+    finally:
+        _STAGE.reset(token)
+        record['seconds'] = round(time.perf_counter() - start, 6)
+        record['peak_rss'] = peak_rss()
+        with _LOCK:
+            _SPANS.append(record)
+
+
+def spans():
+    """
+    Copy of all spans recorded so far, in the order they finished.
+    """
+    with _LOCK:
+        return [dict(s) for s in _SPANS]
+
+
+def reset():
+    with _LOCK:
+        _SPANS.clear()
+
+
+def summarize(records=None):
+    """
+    Totals per (table, stage): seconds, rows and bytes are summed, peak_rss
+    is the maximum. Sorted by seconds, slowest first.
+    """
+    totals = {}
+    for s in spans() if records is None else records:
+        key = (s['table'] or '', s['stage'])
+        total = totals.setdefault(key, {
+            'table': key[0], 'stage': key[1],
+            'seconds': 0.0, 'rows': 0, 'bytes': 0, 'calls': 0, 'errors': 0, 'peak_rss': 0,
+        })
+        total['seconds'] += s['seconds']
+        total['rows'] += s['rows'] or 0
+        total['bytes'] += s['bytes'] or 0
+        total['calls'] += 1
+        total['errors'] += s['status'] != 'success'
+        total['peak_rss'] = max(total['peak_rss'], s['peak_rss'] or 0)
+
+    return sorted(totals.values(), key=lambda t: t['seconds'], reverse=True)
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path, records=None):
+    """
+    Write the spans and their per (table, stage) summary as JSON.
+    """
+    records = spans() if records is None else records
+    _atomic_write(path, json.dumps({'spans': records, 'summary': summarize(records)}, indent=2, default=str))
+    logger.debug(f'Wrote {len(records)} spans to {path}')
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_prometheus(path, records=None):
+    """
+    Write the per (table, stage) summary in the Prometheus text format,
+    e.g. for the node_exporter textfile collector.
+    """
+    summary = summarize(records)
+    lines = []
+    for key, name, help_text in _METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for total in summary:
+            labels = f'table="{_label(total["table"])}",stage="{_label(total["stage"])}"'
+            lines.append(f'{name}{{{labels}}} {total[key]}')
+    _atomic_write(path, '\n'.join(lines) + '\n')
+    logger.debug(f'Wrote stage metrics to {path}')
@@ -1,48 +1,182 @@
+import argparse
 import logging
+import uuid
+from functools import partial
 
-from configs import TABLES_CONFIG
+from configs import LOG_CONFIG, RUN_CONFIG, TABLES_CONFIG, TableConfig, configure_logger, validate_table_config
 from src.etl import ExecutionException, PostProcessingException, post_process, process
-from src.utils import db_conn
+from src import instrumentation
+from src.incremental import FingerprintStore, table_fingerprint
+from src.query_cache import QueryCache
+from src.scheduler import run_tables, upstream_tables
+from src.utils import get_pool, set_query_cache
 from src.validation.report_generator import generate_report
-from src.validation.validation import custom_validator, generic_validator
-
-
-def main():
-    """
-    LOOP (Begin)
-        1. Process each table
-        2. Post process if applicable
-        3. Run general tests
-        4. Run custom tests if applicable
-    LOOP (End)
-    5. Generate report
-    """
-    # Initialize the report dictionary
-    report = {
-        'executed': {'total': len(TABLES_CONFIG), 'success': [], 'failure': {}},
-        'table_creation': {'total': len(TABLES_CONFIG), 'success': [], 'failure': {}},
-        'primary_key_validation': {'total': len(TABLES_CONFIG), 'success': [], 'skipped': [], 'failure': {}},
-        'post_processing': {'total': len({k: v for k, v in TABLES_CONFIG.items() if 'post_process' in v}), 'success': [], 'skipped': [], 'failure': {}},
-        'custom_tests': {'total': sum([len(v['custom_tests']) for v in TABLES_CONFIG.values() if 'custom_tests' in v]), 'success': {}, 'skipped': {}, 'failure': {}}
+from src.validation.validation import custom_validator, generic_validator_batch
+
+
+logger = logging.getLogger(__name__)
+
+def run_table(report, conn, config, store=None, tables_config=None):
+    """
+    1. Process the table
+    2. Post process if applicable
+    (1 and 2 are skipped when the table's fingerprint matches the store)
+    3. Run custom tests if applicable
+    General tests run for all tables at once afterwards, see main.
+    """
+    table_name = config['name']
+    with instrumentation.table_context(table_name):
+        _run_table(report, conn, config, store, tables_config or TABLES_CONFIG)
+
+def _run_table(report, conn, config, store, tables_config):
+    table_name = config['name']
+    fingerprint = None
+    if store is not None and config.get('incremental', True):
+        # select_tables may have trimmed depends_on for scheduling, the fingerprint needs all of it
+        full_config = next((c for c in tables_config.values() if c['name'] == table_name), config)
+        fingerprint = table_fingerprint(conn, full_config, store, tables_config)
+
+    if fingerprint is not None and store.is_current(table_name, fingerprint):
+        logger.info(f'Skipping unchanged table: {table_name}')
+        report['executed']['skipped'].append(table_name)
+        if 'post_process' in config:
+            report['post_processing']['skipped'].append(table_name)
+    else:
+        if store is not None:
+            store.invalidate(table_name)
+        process(report, conn, config)
+        post_process(report, conn, config)
+        if fingerprint is not None:
+            store.record(table_name, fingerprint)
+        elif store is not None:
+            # Rebuilt every run: record a fresh value so dependents see the change
+            store.record(table_name, f'build-{uuid.uuid4().hex}')
+
+    custom_validator(
+        report, conn, config,
+        timeout=RUN_CONFIG.get('custom_test_timeout'),
+        max_workers=RUN_CONFIG.get('custom_test_workers', 4)
+    )
+
+def new_report(tables_config):
+    """
+    Empty report for a run of tables_config.
+    """
+    return {
+        'executed': {'total': len(tables_config), 'success': [], 'skipped': [], 'failure': {}},
+        'table_creation': {'total': len(tables_config), 'success': [], 'failure': {}},
+        'primary_key_validation': {'total': len(tables_config), 'success': [], 'skipped': [], 'failure': {}, 'metrics': {}},
+        'post_processing': {'total': len({k: v for k, v in tables_config.items() if 'post_process' in v}), 'success': [], 'skipped': [], 'failure': {}},
+        'custom_tests': {'total': sum([len(v['custom_tests']) for v in tables_config.values() if 'custom_tests' in v]), 'success': {}, 'skipped': {}, 'failure': {}, 'timings': {}}
     }
 
-    
-    logger = logging.getLogger(__name__)
+def run_pipeline(report, tables_config, pool, store=None, all_tables=None):
+    """
+    1. Run every table (see run_table), concurrently where the tables
+       do not depend on each other (see src.scheduler.run_tables)
+    2. Run general tests for every table from one catalog query
+
+    all_tables is the config tables_config was selected from (tables_config
+    itself by default). Fingerprints are taken against it, so an upstream
+    table that is not selected still counts as built by this pipeline.
+    """
+    run_table_ = partial(run_table, store=store, tables_config=all_tables or tables_config)
+    run_tables(report, tables_config, run_table_, pool=pool)
+    with pool.connection() as conn:
+        generic_validator_batch(report, conn, tables_config)
+
+def select_tables(tables_config, tables=None, tags=None, with_deps=False):
+    """
+    The part of tables_config matching any of tables (config keys or table
+    names, case insensitive) or any of tags, everything when neither is given.
+    with_deps adds every table the selected ones depend on. Explicit
+    depends_on entries on unselected tables are dropped from the copies
+    returned, so a table can run on its own against the upstream tables as
+    they are; fingerprints still use the full config (see run_pipeline).
+    """
+    if not tables and not tags:
+        return tables_config
+
+    wanted = {table.upper() for table in tables or []}
+    known = {key.upper() for key in tables_config} | {config['name'].upper() for config in tables_config.values()}
+    if wanted - known:
+        raise ValueError(f'Unknown tables: {sorted(wanted - known)}')
+
+    tags = set(tags or [])
+    selected = {
+        key for key, config in tables_config.items()
+        if key.upper() in wanted or config['name'].upper() in wanted or tags & set(config.get('tags', []))
+    }
+
+    if with_deps:
+        selected = upstream_tables(tables_config, selected)
+
+    kept = {key.upper() for key in selected} | {tables_config[key]['name'].upper() for key in selected}
+    subset = {}
+    for key, config in tables_config.items():
+        if key not in selected:
+            continue
+        if 'depends_on' in config:
+            config = TableConfig(config)
+            config['depends_on'] = [dep for dep in config['depends_on'] if dep.upper() in kept]
+        subset[key] = config
+    return subset
+
+def main(argv=None):
+    """
+    1. Select the tables to run from the command line, all by default
+    2. Run the pipeline for them (see run_pipeline)
+    3. Generate report, with the timings of every stage in report['stages']
+       (also written to RUN_CONFIG's metrics_json / metrics_prometheus paths)
+       and the query cache statistics in report['query_cache'] when it is enabled
+    """
+    parser = argparse.ArgumentParser(description='Run the ETL pipeline.')
+    parser.add_argument('--tables', nargs='+', help='config keys or names of the tables to run')
+    parser.add_argument('--tags', nargs='+', help='run the tables with any of these tags')
+    parser.add_argument('--with-deps', action='store_true', help='also run the tables the selected ones depend on')
+    parser.add_argument('--list', action='store_true', help='only print the selected tables')
+    parser.add_argument('--no-cache', action='store_true', help="bypass RUN_CONFIG's query_cache")
+    args = parser.parse_args(argv)
+
+    tables_config = select_tables(TABLES_CONFIG, args.tables, args.tags, args.with_deps)
+    if args.list:
+        for key, config in tables_config.items():
+            print(f'{key}: {config["name"]}')
+        return
+
+    for key, config in tables_config.items():
+        validate_table_config(key, config)
+
+    configure_logger(config=LOG_CONFIG, context=instrumentation.current_context)
+    report = new_report(tables_config)
+    store = FingerprintStore(RUN_CONFIG['fingerprint_path']) if RUN_CONFIG.get('incremental') else None
+
+    cache = None
+    if RUN_CONFIG.get('query_cache') and not args.no_cache:
+        cache_config = RUN_CONFIG['query_cache']
+        cache = QueryCache(
+            cache_config['directory'], int(cache_config.get('max_gb', 20) * 2**30), cache_config.get('probes')
+        )
+        set_query_cache(cache)
 
+    pool = get_pool()
     try:
-        conn = db_conn()
-        for table_name, config in TABLES_CONFIG.items():
-            logger.info(f'Running ETL Pipeline for: {table_name}')
-            process(report, conn, config)
-            post_process(report, conn, config)
-            generic_validator(report, conn, config)
-            custom_validator(report, conn, config)
+        run_pipeline(report, tables_config, pool, store, all_tables=TABLES_CONFIG)
 
     except Exception as e:
         logger.error(f'Error running ETL pipeline: {e}')
     finally:
+        records = instrumentation.spans()
+        report['stages'] = {'spans': records, 'summary': instrumentation.summarize(records)}
+        if cache is not None:
+            report['query_cache'] = cache.stats()
+            set_query_cache(None)
+        if RUN_CONFIG.get('metrics_json'):
+            instrumentation.write_json(RUN_CONFIG['metrics_json'], records)
+        if RUN_CONFIG.get('metrics_prometheus'):
+            instrumentation.write_prometheus(RUN_CONFIG['metrics_prometheus'], records)
         generate_report(report)
-        conn.close()
+        pool.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,14 +1,22 @@
+import heapq
 import logging
 import os
 import time
+from bisect import bisect_left
 from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from enum import IntEnum
+from itertools import repeat
+from operator import itemgetter
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from src.utils import db_conn, db_exec, db_get, db_write
+from configs import configure_worker_logger, log_queue
+from src.post_processing.standardize_date_intervals_sql import standardize_date_intervals_in_db
+from src.utils import db_conn, db_exec, db_get, db_get_chunks, db_write, ddl_options, get_pool, table_exists
 
 logger = logging.getLogger(__name__)
 
@@ -90,15 +98,33 @@ def _remove_flagged(final_list):
     """
     return [item for item in final_list if not item.get('remove_flag')]
 
-def _process_intervals_for_id(df_for_id, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False):
+def _prioritize(df_for_id, sdt_col, ndt_col, priority_fn, reverse_sort=False):
     """
-    Core overlap logic for one ID's dataframe.
+    Attach the priority column and sort one ID's rows from low to high priority.
     """
     # Create a priority column
     df_for_id['priority'] = df_for_id.apply(lambda row: priority_fn(row, sdt_col, ndt_col), axis=1)
     # Sort ascending unless reverse_sort=True
-    df_for_id = df_for_id.sort_values(by='priority', ascending=not reverse_sort)
+    return df_for_id.sort_values(by='priority', ascending=not reverse_sort)
 
+def _is_well_formed(df_for_id, sdt_col, ndt_col):
+    """
+    Return True if every interval has both bounds and does not end before it starts.
+    """
+    starts, ends = df_for_id[sdt_col], df_for_id[ndt_col]
+    return bool(starts.notna().all() and ends.notna().all() and (ends >= starts).all())
+
+def _process_intervals_for_id(df_for_id, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False):
+    """
+    Core overlap logic for one ID's dataframe.
+    """
+    df_for_id = _prioritize(df_for_id, sdt_col, ndt_col, priority_fn, reverse_sort)
+    return _carve_scan(df_for_id, sdt_col, ndt_col, id_col)
+
+def _carve_scan(df_for_id, sdt_col, ndt_col, id_col):
+    """
+    Carve out a prioritized dataframe by checking every row against every kept interval.
+    """
     final_list = []
     statuses = {}
 
@@ -130,10 +156,456 @@ def _process_intervals_for_id(df_for_id, sdt_col, ndt_col, id_col, priority_fn,
 
     return final_list, statuses
 
-def process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False):
+def _process_intervals_for_id_sweep(df_for_id, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False):
+    """
+    Sweep-line variant of _process_intervals_for_id.
+
+    The kept intervals never overlap each other, so they are indexed by
+    (start, end, seq) in a sorted list and each new row only binary searches
+    for the intervals it actually overlaps (O(log n + k)) instead of scanning
+    and rebuilding the whole final list. seq is the insertion order, which is
+    used to visit overlaps and to emit the final list in exactly the order
+    (and with exactly the statuses) the scan produces.
+    """
+    df_for_id = _prioritize(df_for_id, sdt_col, ndt_col, priority_fn, reverse_sort)
+
+    if not _is_well_formed(df_for_id, sdt_col, ndt_col):
+        # Missing or inverted bounds break the ordering invariant
+        return _carve_scan(df_for_id, sdt_col, ndt_col, id_col)
+
+    keys = []   # (start, end, seq) of every kept interval, sorted
+    live = {}   # seq -> kept interval, in insertion order
+    statuses = {}
+    seq = 0
+
+    for new_line in df_for_id.to_dict('records'):
+        new_start = new_line[sdt_col]
+        new_end   = new_line[ndt_col]
+
+        # Only the last interval starting before new_start can reach into it
+        lo = bisect_left(keys, (new_start,))
+        if lo and keys[lo - 1][1] > new_start:
+            lo -= 1
+        hi = bisect_left(keys, (new_end,), lo)
+
+        touched = sorted(
+            (key for key in keys[lo:hi] if _intervals_overlap(new_start, new_end, key[0], key[1])),
+            key=itemgetter(2)
+        )
+
+        window = keys[lo:hi]
+        if touched:
+            spawned = []
+            for f_start, f_end, i in touched:
+                overlap_start, overlap_end = _get_overlap_range(
+                    new_start, new_end, f_start, f_end
+                )
+
+                if _fully_subsumes(overlap_start, overlap_end, f_start, f_end):
+                    _handle_fully_subsumed(live[i], statuses, sdt_col, ndt_col, id_col)
+                else:
+                    _handle_partial_overlap(live[i], overlap_start, overlap_end, statuses, spawned, sdt_col, ndt_col, id_col)
+
+            window = []
+            for _, _, i in keys[lo:hi]:
+                existing = live[i]
+                if existing.get('remove_flag'):
+                    del live[i]
+                else:
+                    window.append((existing[sdt_col], existing[ndt_col], i))
+
+            for right in spawned:
+                live[seq] = right
+                window.append((right[sdt_col], right[ndt_col], seq))
+                seq += 1
+
+        # Add the new line
+        new_line['STATUS'] = 'Added/Retained'
+        statuses[(new_line[id_col], new_start, new_end)] = new_line['STATUS']
+        live[seq] = new_line
+        window.append((new_start, new_end, seq))
+        seq += 1
+
+        window.sort()
+        keys[lo:hi] = window
+
+    return list(live.values()), statuses
+
+INTERVAL_ENGINES = {
+    'scan': _process_intervals_for_id,
+    'sweep': _process_intervals_for_id_sweep,
+}
+
+def _get_engine(engine):
+    if engine not in INTERVAL_ENGINES:
+        raise ValueError(f'Unknown interval engine "{engine}", expected one of {list(INTERVAL_ENGINES)}')
+    return INTERVAL_ENGINES[engine]
+
+class AuditStatus(IntEnum):
+    """
+    STATUS codes of the audit trail, see AUDIT_STATUS_LABELS.
+    """
+    ADDED_RETAINED = 0
+    TRIMMED_END = 1
+    TRIMMED_START = 2
+    REMOVED_OVERLAPPED_START = 3
+    REMOVED_FULLY_SUBSUMED = 4
+
+AUDIT_STATUS_LABELS = [
+    'Added/Retained', 'Trimmed End', 'Trimmed Start', 'Removed (Overlapped Start)', 'Removed (Fully Subsumed)'
+]
+AUDIT_CODES = {label: code for code, label in enumerate(AUDIT_STATUS_LABELS)}
+AUDIT_COLUMNS = ['ID', 'ORIGINAL_START', 'ORIGINAL_END', 'NEW_START', 'NEW_END', 'STATUS']
+AUDIT_BATCH_IDS = 1000
+ROW_COL = '__row'
+WRITE_CONN_TIMEOUT = 300
+
+class AuditLog:
+    """
+    Columnar audit trail of a standardization with AUDIT_COLUMNS: one row per
+    kept interval with its source row's original bounds, its new bounds and
+    its AuditStatus code (int8), and one row without new bounds per source
+    row that was removed entirely. Bounds are half-open like the engines'.
+
+    Rows are appended in chunks while the IDs are processed. With a sink,
+    pending rows are handed to sink(frame) and dropped every flush_rows rows
+    so memory stays bounded, otherwise they are kept for to_frame.
+    """
+    def __init__(self, sink=None, flush_rows=1_000_000):
+        self.sink = sink
+        self.flush_rows = flush_rows
+        self.rows = 0
+        self._chunks = []
+        self._pending = 0
+
+    def append(self, frame):
+        if not len(frame):
+            return
+        self._chunks.append(frame)
+        self._pending += len(frame)
+        self.rows += len(frame)
+        if self.sink is not None and self._pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self.sink is None or not self._chunks:
+            return
+        frame = self.to_frame()
+        self._chunks, self._pending = [], 0
+        self.sink(frame)
+
+    def to_frame(self):
+        if not self._chunks:
+            return pd.DataFrame(columns=AUDIT_COLUMNS)
+        return pd.concat(self._chunks, ignore_index=True)
+
+def _audit_rows(df, sdt_col, ndt_col, id_col, rows, new_start, new_end, status, removed):
+    """
+    Audit rows for kept intervals cut from df's rows at positions rows (with
+    their new bounds and status codes) and for df's rows at positions removed.
+    """
+    source = np.concatenate([np.asarray(rows, dtype=np.int64), np.asarray(removed, dtype=np.int64)])
+
+    def new_bounds(values, col):
+        dtype = df[col].dtype
+        kept = pd.Series(np.asarray(values)).astype(dtype)
+        gone = pd.Series(pd.NaT, index=range(len(removed)), dtype=dtype)
+        return pd.concat([kept, gone], ignore_index=True).to_numpy()
+
+    return pd.DataFrame({
+        'ID': df[id_col].take(source).to_numpy() if id_col is not None else None,
+        'ORIGINAL_START': df[sdt_col].take(source).to_numpy(),
+        'ORIGINAL_END': df[ndt_col].take(source).to_numpy(),
+        'NEW_START': new_bounds(new_start, sdt_col),
+        'NEW_END': new_bounds(new_end, ndt_col),
+        'STATUS': np.concatenate([
+            np.asarray(status, dtype=np.int8),
+            np.full(len(removed), AuditStatus.REMOVED_FULLY_SUBSUMED, dtype=np.int8)
+        ]),
+    }, columns=AUDIT_COLUMNS)
+
+def _audit_results(df, results, sdt_col, ndt_col, id_col):
+    """
+    Audit rows for per-ID engine results, given as (positions of the ID's rows
+    in df, result frame carrying ROW_COL) pairs.
+    """
+    group_rows = np.concatenate([rows for rows, _ in results])
+    result_df = pd.concat([result for _, result in results], ignore_index=True)
+    rows = result_df[ROW_COL].to_numpy()
+    return _audit_rows(
+        df, sdt_col, ndt_col, id_col,
+        rows, result_df[sdt_col], result_df[ndt_col], result_df['STATUS'].map(AUDIT_CODES).to_numpy(),
+        np.setdiff1d(group_rows, rows)
+    )
+
+# Status labels by AuditStatus code, the batch engine only carries the codes
+BATCH_STATUSES = np.array(AUDIT_STATUS_LABELS, dtype=object)
+_ORDINAL_OFFSET = 719163  # date(1970, 1, 1).toordinal()
+
+def _day_numbers(series):
+    """
+    Return int64 day numbers for a datetime column and a mask of the values
+    that are whole days (NaT and values with a time part are not).
+    """
+    values = series.to_numpy()
+    days = values.astype('datetime64[D]')
+    return days.astype(np.int64), days == values
+
+def _from_day_numbers(days, like):
+    """
+    Convert int64 day numbers back to a column with the dtype of like.
+    """
+    return pd.Series(days.astype('datetime64[D]')).astype(like.dtype)
+
+def _winners(skey, e, group_lo, query_gi, query_key, query_day):
+    """
+    For each query point, the highest ranked row of its group that covers it,
+    or -1 if there is none.
+
+    Rows are in rank order and, with latest start wins, the winner at a point
+    is the last row started by then whose end is still after it. It is found
+    with a sparse table of running end maxima and a binary-lifting walk to the
+    left that never crosses the group start.
+    """
+    lo = group_lo[query_gi]
+    x = np.searchsorted(skey, query_key, side='right') - 1
+    group_size = int(np.max(np.diff(np.r_[group_lo, len(e)])))
+
+    levels = [e]
+    for k in range(1, group_size.bit_length()):
+        prev = levels[-1]
+        shifted = np.r_[np.full(1 << (k - 1), np.iinfo(np.int64).min), prev[:-(1 << (k - 1))]]
+        levels.append(np.maximum(prev, shifted))
+
+    for k in reversed(range(len(levels))):
+        active = x >= lo
+        cand = x - (1 << k)
+        jump = active & (cand >= lo - 1) & (levels[k][np.where(active, x, 0)] <= query_day)
+        x = np.where(jump, cand, x)
+
+    return np.where(x >= lo, x, -1)
+
+def _carve_days(gid, s, e):
+    """
+    Vectorized "latest start wins" carve-out over rank ordered arrays
+    (gid, start asc, end desc) of half-open day intervals with end > start.
+
+    Returns, in final list order, the rank of the source row, start, end and
+    AuditStatus code (index into BATCH_STATUSES) of every kept segment, plus the
+    ranks of the rows that were removed entirely.
+    """
+    n = len(gid)
+    first = np.r_[True, gid[1:] != gid[:-1]]
+    gi = np.cumsum(first) - 1
+    group_lo = np.flatnonzero(first)
+
+    min_day = s.min()
+    span = e.max() - min_day + 1
+    skey = gi * span + (s - min_day)
+    ekey = gi * span + (e - min_day)
+
+    # Elementary segments between consecutive boundaries of the same group
+    bounds = np.unique(np.concatenate([skey, ekey]))
+    seg = (bounds[:-1] // span) == (bounds[1:] // span)
+    seg_key = bounds[:-1][seg]
+    seg_gi = seg_key // span
+    seg_start = seg_key % span + min_day
+    seg_end = bounds[1:][seg] % span + min_day
+
+    winner = _winners(skey, e, group_lo, seg_gi, seg_key, seg_start)
+    kept = winner >= 0
+    winner, seg_start, seg_end = winner[kept], seg_start[kept], seg_end[kept]
+
+    # Adjacent segments won by the same row form one kept interval
+    new_piece = np.r_[True, (winner[1:] != winner[:-1]) | (seg_start[1:] != seg_end[:-1])]
+    piece_first = np.flatnonzero(new_piece)
+    piece_last = np.r_[piece_first[1:] - 1, len(winner) - 1]
+    rank = winner[piece_first]
+    start = seg_start[piece_first]
+    end = seg_end[piece_last]
+
+    trimmed_start = start > s[rank]
+    trimmed_end = end < e[rank]
+
+    # The first later row starting at the new end trimmed it ...
+    end_by = np.searchsorted(skey, gi[rank] * span + (end - min_day), side='left')
+    # ... and the first later row ending at the new start split it off
+    by_end = np.sort((e - min_day) * n + np.arange(n))
+    found = np.searchsorted(by_end, (start - min_day) * n + rank + 1, side='left')
+    start_by = by_end[np.minimum(found, n - 1)] % n
+
+    status = np.where(
+        trimmed_start,
+        np.where(trimmed_end & (end_by > start_by), 1, 2),
+        np.where(trimmed_end, 1, 0)
+    )
+
+    # Split-off segments are appended just before the row that split them
+    order = np.argsort(np.where(trimmed_start, start_by * 2, rank * 2 + 1), kind='stable')
+
+    removed = np.ones(n, dtype=bool)
+    removed[rank] = False
+
+    return rank[order], start[order], end[order], status[order], np.flatnonzero(removed)
+
+def _boxed(values):
+    """
+    values as a list of python objects (Timestamps for datetimes), boxing
+    every distinct value once rather than every row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    boxed = np.empty(len(uniques), dtype=object)
+    boxed[:] = uniques.tolist()
+    return boxed[codes].tolist()
+
+def _priorities(starts, e, src):
+    """
+    priority_latest_start of the source rows at positions src, as an object
+    array of tuples built once per distinct source row.
+    """
+    rows, inverse = np.unique(src, return_inverse=True)
+    priorities = pd.Series(list(zip(_boxed(starts.take(rows)), (-(e[rows] + _ORDINAL_OFFSET)).tolist())), dtype=object)
+    return priorities.take(inverse).to_numpy()
+
+def _batch_statuses(uniques, codes, starts, ends, status):
+    """
+    Per-ID statuses dicts from parallel arrays of ID codes, bounds and
+    AuditStatus codes, with the labels looked up once for all rows.
+    """
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    starts = _boxed(starts.take(order))
+    ends = _boxed(ends.take(order))
+    labels = BATCH_STATUSES[status[order]].tolist()
+
+    all_statuses = {}
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True]) if len(codes) else []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        i_id = uniques[codes[lo]]
+        keys = zip(repeat(i_id, hi - lo), starts[lo:hi], ends[lo:hi])
+        all_statuses[i_id] = dict(zip(keys, labels[lo:hi]))
+    return all_statuses
+
+def process_intervals_batch(df, sdt_col, ndt_col, id_col, priority_fn=priority_latest_start, reverse_sort=False,
+                            fallback_engine='sweep', batch_rows=1_000_000, audit=None):
+    """
+    Vectorized standardization across all IDs at once.
+
+    Works on int64 day numbers and row positions only, and re-attaches the
+    payload columns with a single take at the end. IDs with missing, inverted,
+    zero-length or non-whole-day intervals go through fallback_engine instead.
+    IDs are carved in batches of roughly batch_rows rows to bound memory.
+
+    statuses holds the final status of every kept segment and
+    'Removed (Fully Subsumed)' for source rows with nothing left; the
+    intermediate trims of the per-ID engines are not replayed.
+    With an AuditLog as audit, the same is appended to it batch by batch
+    instead and statuses is empty.
+    """
+    if priority_fn is not priority_latest_start or reverse_sort:
+        raise ValueError('The batch engine only implements priority_latest_start')
+
+    if id_col is not None:
+        codes, uniques = pd.factorize(df[id_col], sort=True)
+    else:
+        codes, uniques = np.zeros(len(df), dtype=np.int64), [None]
+
+    s, s_ok = _day_numbers(df[sdt_col])
+    e, e_ok = _day_numbers(df[ndt_col])
+
+    grouped = codes >= 0
+    bad_groups = np.unique(codes[grouped & ~(s_ok & e_ok & (e > s))])
+    good = grouped & ~np.isin(codes, bad_groups)
+
+    # Rank order: ID, then priority (start asc, end desc), ties by row position
+    pos = np.flatnonzero(good)
+    pos = pos[np.lexsort((pos, -e[pos], s[pos], codes[pos]))]
+    gid = codes[pos]
+
+    bounds = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1], True]) if len(gid) else np.array([0])
+    pieces, removed = [], []
+    i = 0
+    while i < len(bounds) - 1:
+        j = max(np.searchsorted(bounds, bounds[i] + batch_rows, side='right') - 1, i + 1)
+        chunk = slice(bounds[i], bounds[j])
+        rank, start, end, status, gone = _carve_days(gid[chunk], s[pos[chunk]], e[pos[chunk]])
+        pieces.append((pos[chunk][rank], start, end, status))
+        removed.append(pos[chunk][gone])
+        if audit is not None:
+            audit.append(_audit_rows(
+                df, sdt_col, ndt_col, id_col, pieces[-1][0],
+                _from_day_numbers(start, df[sdt_col]), _from_day_numbers(end, df[ndt_col]), status, removed[-1]
+            ))
+        i = j
+
+    if pieces:
+        src, start, end, status = (np.concatenate(parts) for parts in zip(*pieces))
+        removed = np.concatenate(removed)
+    else:
+        src = start = end = status = removed = np.array([], dtype=np.int64)
+
+    final_df = df.take(src).reset_index(drop=True)
+    final_df[sdt_col] = _from_day_numbers(start, df[sdt_col])
+    final_df[ndt_col] = _from_day_numbers(end, df[ndt_col])
+    final_df['priority'] = _priorities(df[sdt_col], e, src)
+    final_df['STATUS'] = BATCH_STATUSES[status]
+
+    all_statuses = {}
+    if audit is None:
+        all_statuses = _batch_statuses(
+            uniques, np.concatenate([codes[removed], codes[src]]),
+            pd.concat([df[sdt_col].take(removed), final_df[sdt_col]], ignore_index=True),
+            pd.concat([df[ndt_col].take(removed), final_df[ndt_col]], ignore_index=True),
+            np.concatenate([np.full(len(removed), AuditStatus.REMOVED_FULLY_SUBSUMED), status])
+        )
+
+    if len(bad_groups) == 0:
+        return final_df, all_statuses
+
+    # Carve the irregular IDs one by one and splice them back in ID order
+    logger.debug(f'{len(bad_groups)} IDs with irregular intervals use the {fallback_engine} engine')
+    process_fn = _get_engine(fallback_engine)
+    frames, frame_codes = [final_df], [codes[src]]
+    for code in bad_groups:
+        group_rows = np.flatnonzero(codes == code)
+        group_df = df.take(group_rows)
+        if audit is not None:
+            group_df[ROW_COL] = group_rows
+        final_list, statuses = process_fn(group_df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort)
+        result = pd.DataFrame(final_list)
+        if audit is not None:
+            audit.append(_audit_results(df, [(group_rows, result)], sdt_col, ndt_col, id_col))
+            result = result.drop(columns=ROW_COL)
+        else:
+            all_statuses[uniques[code]] = statuses
+        frames.append(result)
+        frame_codes.append(np.full(len(final_list), code))
+
+    order = np.argsort(np.concatenate(frame_codes), kind='stable')
+    final_df = pd.concat(frames, ignore_index=True).take(order).reset_index(drop=True)
+    if audit is None:
+        all_statuses = {uniques[code]: all_statuses[uniques[code]] for code in np.unique(codes[grouped])}
+    return final_df, all_statuses
+
+def process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False, engine='scan',
+                                   audit=None):
     """
     Single-threaded standardization operating on a dataframe.
+    engine picks the per-ID implementation from INTERVAL_ENGINES,
+    or 'batch' for the vectorized process_intervals_batch.
+
+    With an AuditLog as audit, the outcome of every source row is appended
+    to it every AUDIT_BATCH_IDS IDs, and the per-ID statuses dicts are not
+    kept (an empty dict is returned instead).
     """
+    if engine == 'batch':
+        return process_intervals_batch(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort, audit=audit)
+
+    process_fn = _get_engine(engine)
+    if audit is not None:
+        # Carry every source row's position through the engine
+        df = df.assign(**{ROW_COL: np.arange(len(df))})
+
     if id_col is not None:
         grouped = df.groupby(id_col)
     else:
@@ -143,6 +615,7 @@ def process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, re
     # Process each ID's intervals separately
     final_results = []
     all_statuses = {}
+    pending_audit = []
 
     if reverse_sort:
         def adjusted_priority_fn(x):
@@ -152,28 +625,373 @@ def process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, re
         used_priority_fn = priority_fn
 
     for i_id, group_df in tqdm(grouped, desc='Processing IDs', position=0):
-        final_list, statuses = _process_intervals_for_id(
+        final_list, statuses = process_fn(
             group_df.copy(), sdt_col, ndt_col, id_col, used_priority_fn, reverse_sort
         )
         final_results.append(pd.DataFrame(final_list))
-        all_statuses[i_id] = statuses
+        if audit is None:
+            all_statuses[i_id] = statuses
+            continue
+
+        pending_audit.append((group_df[ROW_COL].to_numpy(), final_results[-1]))
+        if len(pending_audit) >= AUDIT_BATCH_IDS:
+            audit.append(_audit_results(df, pending_audit, sdt_col, ndt_col, id_col))
+            pending_audit = []
+
+    if pending_audit:
+        audit.append(_audit_results(df, pending_audit, sdt_col, ndt_col, id_col))
 
     logger.debug('All IDs processed')
     # Concatenate final pieces for all IDs
     final_df = pd.concat(final_results, ignore_index=True)
+    if audit is not None:
+        final_df = final_df.drop(columns=ROW_COL)
     return final_df, all_statuses
 
-# TODO: generalize to work with any table, with or without grouping with ID
-def standardize_date_intervals(table_name, conn, sdt_col, ndt_col, id_col=None):
-    logger.debug('Starting Date Standardization...')
-    df = db_get(conn, f'SELECT * FROM {table_name}')
+def _shard_groups(sizes, n_shards):
+    """
+    Assign group codes to at most n_shards shards with balanced row counts,
+    placing the largest groups first onto the least loaded shard.
+    """
+    heap = [(0, shard) for shard in range(n_shards)]
+    shards = [[] for _ in range(n_shards)]
+    for code in np.argsort(-sizes, kind='stable'):
+        load, shard = heapq.heappop(heap)
+        shards[shard].append(code)
+        heapq.heappush(heap, (load + int(sizes[code]), shard))
+    return [np.sort(shard) for shard in shards if shard]
+
+def process_intervals_parallel(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort=False, engine='scan', workers=None,
+                               audit=None):
+    """
+    Standardization sharded by id_col across a process pool.
+
+    Workers only receive the id, date and row position columns; payload
+    columns are re-attached afterwards, and the results are put back in ID
+    order so the output matches process_intervals_singlethread.
+    With an AuditLog as audit, the audit rows are built here from the merged
+    row positions and the workers' statuses are dropped.
+    """
+    workers = workers or os.cpu_count()
+    if id_col is None or workers <= 1:
+        return process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort, engine, audit)
+
+    codes, uniques = pd.factorize(df[id_col], sort=True)
+    sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    shards = _shard_groups(sizes, workers)
+    if len(shards) <= 1:
+        return process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_fn, reverse_sort, engine, audit)
+
+    slim = df[[id_col, sdt_col, ndt_col]].copy()
+    slim[ROW_COL] = np.arange(len(df))
+
+    logger.debug(f'Processing {len(uniques)} IDs in {len(shards)} shards')
+    with ProcessPoolExecutor(
+        max_workers=len(shards), initializer=configure_worker_logger, initargs=(log_queue(),)
+    ) as executor:
+        futures = [
+            executor.submit(
+                process_intervals_singlethread,
+                slim[np.isin(codes, shard)], sdt_col, ndt_col, id_col, priority_fn, reverse_sort, engine
+            )
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+    # Put the shards back in ID order, keeping each ID's own order
+    merged = pd.concat([shard_df for shard_df, _ in results], ignore_index=True)
+    rows = merged[ROW_COL].to_numpy()
+    order = np.argsort(codes[rows], kind='stable')
+    merged, rows = merged.take(order), rows[order]
+
+    final_df = df.take(rows).reset_index(drop=True)
+    for col in (sdt_col, ndt_col, 'priority', 'STATUS'):
+        final_df[col] = merged[col].to_numpy()
+
+    if audit is not None:
+        audit.append(_audit_results(df, [(np.flatnonzero(codes >= 0), merged)], sdt_col, ndt_col, id_col))
+        logger.debug('All shards processed')
+        return final_df, {}
+
+    shard_statuses = {}
+    for _, statuses in results:
+        shard_statuses.update(statuses)
+    all_statuses = {i_id: shard_statuses[i_id] for i_id in uniques if i_id in shard_statuses}
+
+    logger.debug('All shards processed')
+    return final_df, all_statuses
+
+def _read_table(conn, table_name, sdt_col, ndt_col, use_arrow=False):
+    query = f'SELECT * FROM {table_name}'
+    if use_arrow:
+        # Payload columns stay pyarrow backed, only the dates are carved as datetime64
+        df = db_get(conn, query, dtype_backend='pyarrow')
+        df[sdt_col] = df[sdt_col].astype('datetime64[us]')
+        df[ndt_col] = df[ndt_col].astype('datetime64[us]')
+        return df
+    df = db_get(conn, query)
     df[sdt_col] = pd.to_datetime(df[sdt_col])
     df[ndt_col] = pd.to_datetime(df[ndt_col])
+    return df
+
+def _drop_invalid_intervals(df, sdt_col, ndt_col):
+    """
+    df without the rows whose interval is missing a bound, inverted or empty,
+    which the 'sql' engine cannot carve either.
+    """
+    valid = (df[ndt_col] > df[sdt_col]).to_numpy(dtype=bool, na_value=False)
+    if valid.all():
+        return df
+    logger.warning(f'Leaving out {int((~valid).sum())} rows with a missing, inverted or zero-length interval')
+    return df[valid].reset_index(drop=True)
+
+def _standardize(df, sdt_col, ndt_col, id_col, engine, workers, audit=None):
+    df = _drop_invalid_intervals(df, sdt_col, ndt_col)
+    if workers != 1:
+        results_df, statuses = process_intervals_parallel(
+            df, sdt_col, ndt_col, id_col, priority_latest_start, engine=engine, workers=workers, audit=audit
+        )
+    else:
+        results_df, statuses = process_intervals_singlethread(
+            df, sdt_col, ndt_col, id_col, priority_latest_start, engine=engine, audit=audit
+        )
 
-    results_df, statuses = process_intervals_singlethread(df, sdt_col, ndt_col, id_col, priority_latest_start)
-    
-    # Save to DB
     results_df[ndt_col] -= timedelta(days=1) # convert from [sdt_col, ndt_col) to [sdt_col, ndt_col]
-    db_write(results_df, table_name)
+    return results_df, statuses
+
+def _chunk_writer(conn, table_name, use_pipe=False, use_arrow=False, **ddl):
+    """
+    Sink bulk loading every chunk it is called with into table_name: the
+    first one replaces the table, later ones go through a staging table.
+    Its written attribute lists the row counts loaded so far. ddl are
+    db_write's DDL arguments; the types are never sized from the first
+    chunk, as later ones may not fit.
+    """
+    part_table = f'{table_name}_PART'
+    ddl['sized_types'] = False
+
+    def write(frame):
+        if not write.written:
+            db_write(frame, table_name, use_pipe=use_pipe, conn=conn, use_arrow=use_arrow, **ddl)
+        else:
+            db_write(frame, part_table, use_pipe=use_pipe, conn=conn, use_arrow=use_arrow, **ddl)
+            db_exec(conn, f'INSERT INTO {table_name} SELECT * FROM {part_table}')
+            db_exec(conn, f'DROP TABLE {part_table} IF EXISTS')
+        write.written.append(len(frame))
+        logger.debug(f'Wrote {len(frame)} rows to {table_name}')
+
+    write.written = []
+    return write
+
+def _id_batches(chunks, id_col):
+    """
+    Regroup chunks of a table sorted by id_col so that every ID ends up in
+    exactly one batch: the trailing ID of a chunk is held back and prepended
+    to the next one. A batch is at most one chunk plus one ID's rows.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+
+        ids = chunk[id_col]
+        last = ids.iloc[-1]
+        is_last = (ids.isna() if pd.isna(last) else ids == last).to_numpy()
+        others = np.flatnonzero(~is_last)
+        cut = others[-1] + 1 if len(others) else 0
+        if cut:
+            yield chunk.iloc[:cut].reset_index(drop=True)
+        carry = chunk.iloc[cut:].reset_index(drop=True)
+
+    if carry is not None and not carry.empty:
+        yield carry
+
+def _standardize_out_of_core(table_name, conn, sdt_col, ndt_col, id_col, engine, workers, chunk_size,
+                             audit_table=None, use_pipe=False, use_arrow=False, ddl=None):
+    """
+    Standardize table_name one batch of whole IDs at a time: the table is
+    streamed in ORDER BY id_col in chunks of chunk_size rows, and every
+    batch's result is loaded into a staging table right away, which then
+    replaces table_name. Only one batch and its result are held in memory.
+
+    The results (and the audit trail to audit_table) are written on a second
+    connection from the pool while the source is still being read on conn.
+    It is waited for at most WRITE_CONN_TIMEOUT seconds, so an exhausted
+    pool fails the table instead of deadlocking it.
+    """
+    stream_table = f'{table_name}_SDI_STREAM'
+    query = f'SELECT * FROM {table_name} ORDER BY {id_col}'
+    options = ddl_options(conn, table_name, ddl, [id_col])
+
+    pool = get_pool()
+    try:
+        write_conn = pool.checkout(WRITE_CONN_TIMEOUT)
+    except TimeoutError as e:
+        raise RuntimeError(
+            f'Out of core standardization of {table_name} needs a second pooled connection: {e}. '
+            f'Run fewer tables at once or enlarge the pool'
+        ) from e
+
+    try:
+        write = _chunk_writer(write_conn, stream_table, use_pipe, use_arrow, **options)
+        audit = None
+        if audit_table:
+            audit = AuditLog(sink=_chunk_writer(write_conn, audit_table, use_pipe, use_arrow, distribute_on=['ID']))
+
+        for batch in _id_batches(db_get_chunks(conn, query, chunk_size), id_col):
+            batch[sdt_col] = pd.to_datetime(batch[sdt_col])
+            batch[ndt_col] = pd.to_datetime(batch[ndt_col])
+            results_df, _ = _standardize(batch, sdt_col, ndt_col, id_col, engine, workers, audit)
+            write(results_df)
+
+        if audit is not None:
+            audit.flush()
+    finally:
+        pool.checkin(write_conn)
+
+    if not write.written:
+        logger.debug(f'{table_name} is empty, nothing to standardize')
+        return 0
+
+    db_exec(conn, f'DROP TABLE {table_name} IF EXISTS')
+    db_exec(conn, f'ALTER TABLE {stream_table} RENAME TO {table_name}')
+    logger.debug(f'Standardized {table_name} out of core in {len(write.written)} batches')
+    return sum(write.written)
+
+# TODO: generalize to work with any table, with or without grouping with ID
+def standardize_date_intervals(table_name, conn, sdt_col, ndt_col, id_col=None, engine='scan', workers=1,
+                               audit_table=None, chunk_size=None, use_pipe=False, use_arrow=False,
+                               out_of_core=False, ddl=None):
+    """
+    audit_table (True for <table_name>_AUDIT) receives the audit trail of
+    every source row, see AuditLog. The statuses dicts are then not kept and
+    the returned statuses are empty.
+
+    out_of_core standardizes batches of whole IDs streamed in chunk_size
+    rows (100,000 by default) at a time, see _standardize_out_of_core, so
+    memory is bounded by the chunk size and the largest ID rather than the
+    table. Nothing is returned then. Otherwise the table is read whole and
+    chunk_size must not be given.
+
+    ddl is the table's 'ddl' config (see ddl_options); the rewritten table
+    is distributed on id_col unless it says otherwise.
+
+    Rows with a missing, inverted or zero-length interval are left out (with
+    a warning) by every engine.
+    """
+    if audit_table is True:
+        audit_table = f'{table_name}_AUDIT'
+
+    if chunk_size is not None and not out_of_core:
+        raise ValueError('chunk_size only applies to out_of_core standardization')
+
+    if engine == 'sql':
+        # Carve out inside the database, nothing is pulled into pandas
+        standardize_date_intervals_in_db(table_name, conn, sdt_col, ndt_col, id_col, audit_table, ddl)
+        return None, None
+
+    if out_of_core:
+        if id_col is None:
+            raise ValueError('Out of core standardization needs an id_col to cut the table at')
+        _standardize_out_of_core(
+            table_name, conn, sdt_col, ndt_col, id_col, engine, workers, chunk_size or 100_000, audit_table,
+            use_pipe, use_arrow, ddl
+        )
+        return None, None
+
+    options = ddl_options(conn, table_name, ddl, [id_col] if id_col is not None else None)
+    audit = None
+    if audit_table:
+        audit_key = ['ID'] if id_col is not None else None
+        audit = AuditLog(sink=_chunk_writer(conn, audit_table, use_pipe, use_arrow, distribute_on=audit_key))
+
+    logger.debug('Starting Date Standardization...')
+    df = _read_table(conn, table_name, sdt_col, ndt_col, use_arrow)
+    results_df, statuses = _standardize(df, sdt_col, ndt_col, id_col, engine, workers, audit)
+
+    # Save to DB
+    db_write(results_df, table_name, use_pipe=use_pipe, conn=conn, use_arrow=use_arrow, **options)
+    if audit is not None:
+        audit.flush()
+        logger.debug(f'{audit.rows} audit rows written to {audit_table}')
+
+    return results_df, statuses
+
+def _id_hashes(df, id_col):
+    """
+    Order independent content hash of every ID's rows.
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    return row_hashes.groupby(df[id_col].to_numpy()).sum()
+
+def _replace_ids(conn, target_table, id_col, ids, results_df, use_pipe=False):
+    """
+    Delete every row of ids from target_table and insert results_df in its
+    place within one transaction, going through two staging tables
+    distributed like target_table on id_col.
+    """
+    ids_table, delta_table = f'{target_table}_IDS', f'{target_table}_DELTA'
+    db_write(pd.DataFrame({id_col: ids}), ids_table, use_pipe=use_pipe, conn=conn, distribute_on=[id_col])
+    if results_df is not None:
+        db_write(results_df, delta_table, use_pipe=use_pipe, conn=conn, distribute_on=[id_col])
+
+    cursor = conn.cursor()
+    cursor.execute(f'DELETE FROM {target_table} WHERE {id_col} IN (SELECT {id_col} FROM {ids_table})')
+    if results_df is not None:
+        cursor.execute(f'INSERT INTO {target_table} SELECT * FROM {delta_table}')
+    conn.commit()
+    cursor.close()
+
+    db_exec(conn, f'DROP TABLE {ids_table} IF EXISTS')
+    db_exec(conn, f'DROP TABLE {delta_table} IF EXISTS')
+
+def standardize_date_intervals_incremental(table_name, conn, sdt_col, ndt_col, id_col, target_table=None,
+                                           state_dir='state', engine='scan', workers=1, use_pipe=False,
+                                           ddl=None):
+    """
+    Per-ID incremental standardization of table_name into target_table
+    (table_name + '_STD' by default).
+
+    A content hash of every ID's source rows is kept in state_dir. Only the
+    IDs whose hash changed since the last run are carved out again, and only
+    those IDs (plus the ones that disappeared) are deleted from and inserted
+    into target_table. Without previous state, or if target_table is missing,
+    every ID is standardized and target_table is written in full, with the
+    DDL from ddl (see ddl_options) but types that fit later IDs' rows too.
+    """
+    target_table = target_table or f'{table_name}_STD'
+    state_path = os.path.join(state_dir, f'{target_table}_id_hashes.pkl')
+
+    logger.debug('Starting incremental Date Standardization...')
+    df = _read_table(conn, table_name, sdt_col, ndt_col)
+    hashes = _id_hashes(df, id_col)
+
+    if not os.path.exists(state_path) or not table_exists(conn, target_table):
+        logger.debug('No previous run state, standardizing every ID')
+        results_df, statuses = _standardize(df, sdt_col, ndt_col, id_col, engine, workers)
+        options = ddl_options(conn, target_table, ddl, [id_col])
+        options['sized_types'] = False
+        db_write(results_df, target_table, use_pipe=use_pipe, conn=conn, **options)
+    else:
+        previous = pd.read_pickle(state_path)
+        current_keys = pd.MultiIndex.from_arrays([hashes.index, hashes.to_numpy()])
+        previous_keys = pd.MultiIndex.from_arrays([previous.index, previous.to_numpy()])
+        changed = hashes.index[~current_keys.isin(previous_keys)]
+        removed = previous.index.difference(hashes.index)
+        logger.debug(f'{len(changed)} changed and {len(removed)} removed IDs out of {len(hashes)}')
+
+        results_df, statuses = None, {}
+        if len(changed):
+            results_df, statuses = _standardize(
+                df[df[id_col].isin(changed)], sdt_col, ndt_col, id_col, engine, workers
+            )
+        if len(changed) or len(removed):
+            _replace_ids(conn, target_table, id_col, changed.append(removed), results_df, use_pipe)
+
+    # Only remember the hashes once the target reflects them
+    os.makedirs(state_dir, exist_ok=True)
+    hashes.to_pickle(state_path)
 
-    return results_df, statuses
\ No newline at end of file
+    return results_df, statuses
@@ -0,0 +1,235 @@
+import logging
+
+from src.utils import db_exec, db_get, fetch_table_ddl
+
+logger = logging.getLogger(__name__)
+
+"""
+In-database "latest start wins" standardization, equivalent to running
+standardize_date_intervals with priority_latest_start but without the table
+ever leaving Netezza.
+
+The carve-out is done the same way as process_intervals_batch:
+    1. Rank each ID's rows by priority (start asc, end desc)
+    2. Split each ID's timeline into elementary segments between the union of
+       all start and end dates (LEAD over the boundaries)
+    3. Give each segment to the highest ranked row covering it
+    4. Merge adjacent segments won by the same row (LAG + running SUM)
+    5. Derive the status from the first later rows that start at the new end
+       and end at the new start
+
+Rows with a missing, inverted or zero-length interval are left out, as they
+are by standardize_date_intervals for every other engine.
+"""
+
+
+def _stage(table_name, stage):
+    return f'{table_name}_SDI_{stage}'
+
+
+def _scratch_tables(table_name):
+    return [_stage(table_name, s) for s in ('SRC', 'SEG', 'WIN', 'PIECE', 'KEPT', 'OUT')]
+
+
+def _columns_list(columns):
+    return ', '.join([columns] if isinstance(columns, str) else columns)
+
+
+def _target_ddl(id_col, ddl):
+    """
+    DISTRIBUTE ON / ORGANIZE ON clauses of the rewritten table from its 'ddl'
+    config, distributed on id_col unless it says otherwise.
+    """
+    distribute_on = ddl.get('distribute_on') or ([id_col] if id_col is not None else 'RANDOM')
+    if isinstance(distribute_on, str) and distribute_on.upper() == 'RANDOM':
+        clauses = 'DISTRIBUTE ON RANDOM'
+    else:
+        clauses = f'DISTRIBUTE ON ({_columns_list(distribute_on)})'
+    if ddl.get('organize_on'):
+        clauses += f"\n    ORGANIZE ON ({_columns_list(ddl['organize_on'])})"
+    return clauses
+
+
+def generate_standardize_sql(table_name, columns, sdt_col, ndt_col, id_col=None, audit_table=None, ddl=None):
+    """
+    Generate the statements that standardize table_name in place.
+    columns are the table's columns in order. Rows without an ID or with
+    missing, inverted or zero-length intervals are left out, and the helper
+    priority column of the pandas path is not written. The scratch tables are
+    not dropped at the end, see standardize_date_intervals_in_db.
+
+    ddl is the table's 'ddl' config: its distribute_on and organize_on are
+    used for the rewritten table. The CTAS keeps the column types as they are.
+    """
+    src, seg, win, piece, kept, target = _scratch_tables(table_name)
+
+    grp = f's.{id_col}' if id_col is not None else '1'
+    partition = f'PARTITION BY s.{id_col}' if id_col is not None else ''
+    has_id = f'AND s.{id_col} IS NOT NULL' if id_col is not None else ''
+    distribute = _target_ddl(id_col, ddl or {})
+
+    select_cols = []
+    for col in columns:
+        if col == sdt_col:
+            select_cols.append(f'k.NEW_START AS {sdt_col}')
+        elif col == ndt_col:
+            # convert from [sdt_col, ndt_col) to [sdt_col, ndt_col]
+            select_cols.append(f'k.NEW_END - 1 AS {ndt_col}')
+        else:
+            select_cols.append(f's.{col}')
+    select_str = ',\n        '.join(select_cols)
+
+    statements = [f'DROP TABLE {t} IF EXISTS' for t in (src, seg, win, piece, kept, target)]
+
+    statements.append(f"""
+    CREATE TEMP TABLE {src} AS
+    SELECT s.*,
+        {grp} AS GRP_ID,
+        ROW_NUMBER() OVER ({partition} ORDER BY s.{sdt_col}, s.{ndt_col} DESC, s.ROWID) AS RNK
+    FROM {table_name} s
+    WHERE s.{sdt_col} < s.{ndt_col} {has_id}
+    DISTRIBUTE ON (GRP_ID)
+    """)
+
+    statements.append(f"""
+    CREATE TEMP TABLE {seg} AS
+    SELECT GRP_ID, SEG_START, SEG_END
+    FROM (
+        SELECT GRP_ID, B AS SEG_START, LEAD(B) OVER (PARTITION BY GRP_ID ORDER BY B) AS SEG_END
+        FROM (
+            SELECT GRP_ID, {sdt_col} AS B FROM {src}
+            UNION
+            SELECT GRP_ID, {ndt_col} AS B FROM {src}
+        ) b
+    ) g
+    WHERE SEG_END IS NOT NULL
+    DISTRIBUTE ON (GRP_ID)
+    """)
+
+    statements.append(f"""
+    CREATE TEMP TABLE {win} AS
+    SELECT g.GRP_ID, g.SEG_START, g.SEG_END, MAX(s.RNK) AS RNK
+    FROM {seg} g
+    JOIN {src} s
+        ON s.GRP_ID = g.GRP_ID
+        AND s.{sdt_col} <= g.SEG_START
+        AND s.{ndt_col} >= g.SEG_END
+    GROUP BY g.GRP_ID, g.SEG_START, g.SEG_END
+    DISTRIBUTE ON (GRP_ID)
+    """)
+
+    statements.append(f"""
+    CREATE TEMP TABLE {piece} AS
+    SELECT GRP_ID, RNK, MIN(SEG_START) AS NEW_START, MAX(SEG_END) AS NEW_END
+    FROM (
+        SELECT GRP_ID, RNK, SEG_START, SEG_END,
+            SUM(NEW_PIECE) OVER (PARTITION BY GRP_ID ORDER BY SEG_START ROWS UNBOUNDED PRECEDING) AS PIECE_NO
+        FROM (
+            SELECT w.*,
+                CASE
+                    WHEN LAG(RNK) OVER (PARTITION BY GRP_ID ORDER BY SEG_START) = RNK
+                        AND LAG(SEG_END) OVER (PARTITION BY GRP_ID ORDER BY SEG_START) = SEG_START
+                    THEN 0 ELSE 1
+                END AS NEW_PIECE
+            FROM {win} w
+        ) w
+    ) w
+    GROUP BY GRP_ID, PIECE_NO, RNK
+    DISTRIBUTE ON (GRP_ID)
+    """)
+
+    statements.append(f"""
+    CREATE TEMP TABLE {kept} AS
+    SELECT k.GRP_ID, k.RNK, k.NEW_START, k.NEW_END,
+        CASE
+            WHEN k.NEW_START > k.OLD_START THEN
+                CASE WHEN k.NEW_END < k.OLD_END AND k.END_BY > k.START_BY THEN 'Trimmed End' ELSE 'Trimmed Start' END
+            WHEN k.NEW_END < k.OLD_END THEN 'Trimmed End'
+            ELSE 'Added/Retained'
+        END AS STATUS
+    FROM (
+        SELECT p.GRP_ID, p.RNK, p.NEW_START, p.NEW_END,
+            s.{sdt_col} AS OLD_START, s.{ndt_col} AS OLD_END,
+            MIN(e.RNK) AS END_BY, MIN(x.RNK) AS START_BY
+        FROM {piece} p
+        JOIN {src} s ON s.GRP_ID = p.GRP_ID AND s.RNK = p.RNK
+        LEFT JOIN {src} e ON e.GRP_ID = p.GRP_ID AND e.{sdt_col} = p.NEW_END
+        LEFT JOIN {src} x ON x.GRP_ID = p.GRP_ID AND x.{ndt_col} = p.NEW_START AND x.RNK > p.RNK
+        GROUP BY p.GRP_ID, p.RNK, p.NEW_START, p.NEW_END, s.{sdt_col}, s.{ndt_col}
+    ) k
+    DISTRIBUTE ON (GRP_ID)
+    """)
+
+    statements.append(f"""
+    CREATE TABLE {target} AS
+    SELECT
+        {select_str},
+        k.STATUS
+    FROM {kept} k
+    JOIN {src} s ON s.GRP_ID = k.GRP_ID AND s.RNK = k.RNK
+    {distribute}
+    """)
+
+    if audit_table is not None:
+        statements.append(f'DROP TABLE {audit_table} IF EXISTS')
+        statements.append(f"""
+        CREATE TABLE {audit_table} AS
+        SELECT s.GRP_ID AS ID,
+            s.{sdt_col} AS ORIGINAL_START, s.{ndt_col} AS ORIGINAL_END,
+            k.NEW_START, k.NEW_END,
+            CAST(CASE k.STATUS
+                WHEN 'Added/Retained' THEN 0
+                WHEN 'Trimmed End' THEN 1
+                WHEN 'Trimmed Start' THEN 2
+                ELSE 4
+            END AS SMALLINT) AS STATUS
+        FROM {src} s
+        LEFT JOIN {kept} k ON k.GRP_ID = s.GRP_ID AND k.RNK = s.RNK
+        DISTRIBUTE ON (ID)
+        """)
+
+    statements += [
+        f'DROP TABLE {table_name} IF EXISTS',
+        f'ALTER TABLE {target} RENAME TO {table_name}',
+    ]
+    return statements
+
+
+def standardize_date_intervals_in_db(table_name, conn, sdt_col, ndt_col, id_col=None, audit_table=None, ddl=None):
+    """
+    Standardize table_name with a CTAS next to the data instead of pulling
+    it into pandas. audit_table optionally receives one row per source
+    interval with its original and new bounds and its AuditStatus code,
+    like the AuditLog of the pandas engines. ddl is the table's 'ddl'
+    config (see generate_standardize_sql); with preserve the table keeps
+    its current distribution unless distribute_on is given.
+
+    The statements run in one transaction, so table_name is either fully
+    replaced or left as it was; the scratch tables are dropped either way.
+    """
+    logger.debug('Starting in-database Date Standardization...')
+    columns = list(db_get(conn, f'SELECT * FROM {table_name} LIMIT 0').columns)
+    rejected = db_get(conn, f"""
+    SELECT COUNT(*) AS N FROM {table_name}
+    WHERE {sdt_col} IS NULL OR {ndt_col} IS NULL OR {ndt_col} <= {sdt_col}
+    """)['N'].iat[0]
+    if rejected:
+        logger.warning(f'Leaving out {rejected} rows with a missing, inverted or zero-length interval')
+
+    ddl = ddl or {}
+    if ddl.get('preserve') and not ddl.get('distribute_on'):
+        ddl = {**ddl, 'distribute_on': fetch_table_ddl(conn, table_name)['distribute_on']}
+
+    statements = generate_standardize_sql(table_name, columns, sdt_col, ndt_col, id_col, audit_table, ddl)
+    try:
+        with conn.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        for table in _scratch_tables(table_name):
+            db_exec(conn, f'DROP TABLE {table} IF EXISTS')
+
+    logger.debug('In-database Date Standardization done')
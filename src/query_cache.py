@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from src.instrumentation import span
+from src.scheduler import referenced_tables
+
+logger = logging.getLogger(__name__)
+
+"""
+Opt-in on-disk cache of db_get results, for reruns and development against
+tables that did not change.
+
+A result is stored as a Parquet file keyed by the normalized SQL, the db_get
+options and a freshness probe of every table the query reads (after FROM /
+JOIN). By default the probe is the table's OBJID and CREATEDATE from _V_TABLE,
+which change whenever the table is dropped and created again, plus its row
+count; probes can configure stricter queries per table. Queries whose tables
+cannot all be probed (no tables at all, a failing probe) are never cached.
+Least recently used files are evicted once the cache grows past max_bytes.
+Catalog queries (INFORMATION_SCHEMA, _V_ views) are not cached either.
+
+A probe only sees what it queries, so tables written during the run (see
+mark_built) always bypass the cache: an INSERT into an existing table keeps
+its OBJID, and an update need not change its row count.
+"""
+
+DEFAULT_PROBES = (
+    "SELECT OBJID, CREATEDATE FROM _V_TABLE WHERE UPPER(TABLENAME) = '{name}'",
+    'SELECT COUNT(*) FROM {table}',
+)
+
+_CATALOG = re.compile(r'^(?:INFORMATION_SCHEMA\.|_V_)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_STATS = ('hits', 'misses', 'uncacheable', 'stores', 'evictions', 'bytes_read', 'bytes_written')
+
+
+def normalize_sql(query):
+    """
+    query with runs of whitespace outside string literals collapsed and
+    without a trailing ';', so formatting changes do not miss the cache.
+    """
+    parts = query.strip().rstrip(';').split("'")
+    parts[::2] = [_WHITESPACE.sub(' ', part) for part in parts[::2]]
+    return "'".join(parts).strip()
+
+
+def _restore_units(df, path):
+    """
+    Cast datetime columns back to the unit they were stored from, as
+    Parquet has no second resolution timestamps.
+    """
+    for column in pq.read_schema(path).pandas_metadata['columns']:
+        name, numpy_type = column['name'], column['numpy_type']
+        if numpy_type.startswith('datetime64[') and name in df and str(df[name].dtype) != numpy_type:
+            df[name] = df[name].astype(numpy_type)
+    return df
+
+
+class QueryCache:
+    """
+    Parquet result cache in directory, holding at most max_bytes.
+    Safe to share between threads.
+    """
+    def __init__(self, directory, max_bytes=20 * 2**30, probes=None):
+        if pq is None:
+            raise ImportError('The query cache requires the pyarrow package')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.probes = probes or {}
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(_STATS, 0)
+        self._built = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    @staticmethod
+    def _name(table):
+        return table.rsplit('.', 1)[-1].upper()
+
+    def mark_built(self, table):
+        """
+        Never serve queries reading table from the cache again, as it is being
+        (re)built by this run.
+        """
+        with self._lock:
+            self._built.add(self._name(table))
+
+    def _probe(self, conn, table):
+        if table in self.probes:
+            queries = [self.probes[table]]
+        else:
+            queries = [probe.format(table=table, name=self._name(table)) for probe in DEFAULT_PROBES]
+
+        rows = []
+        with conn.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(sql)
+                rows.append([list(row) for row in cursor.fetchall()])
+        return rows
+
+    def key(self, conn, query, options=None):
+        """
+        Cache key of query with the db_get options, None when it must not be cached.
+        """
+        tables = referenced_tables(query)
+        if not tables or any(_CATALOG.match(table) for table in tables):
+            return None
+        with self._lock:
+            if any(self._name(table) in self._built for table in tables):
+                return None
+        try:
+            freshness = {table: self._probe(conn, table) for table in sorted(tables)}
+        except Exception as e:
+            logger.debug(f'Not caching query, freshness probe failed: {e}')
+            return None
+
+        payload = {'sql': normalize_sql(query), 'options': options, 'freshness': freshness}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def fetch(self, conn, query, load, options=None):
+        """
+        Result of query from the cache, or from load() (stored for next time).
+        options are the db_get arguments load uses; they are part of the key.
+        """
+        key = self.key(conn, query, options)
+        if key is None:
+            self._count('uncacheable')
+            return load()
+
+        path = os.path.join(self.directory, f'{key}.parquet')
+        if os.path.exists(path):
+            try:
+                with span('query_cache', cache='hit') as s:
+                    if (options or {}).get('dtype_backend') == 'pyarrow':
+                        df = pd.read_parquet(path, dtype_backend='pyarrow')
+                    else:
+                        df = _restore_units(pd.read_parquet(path), path)
+                    s['rows'], s['bytes'] = len(df), os.path.getsize(path)
+                os.utime(path)
+                self._count('hits')
+                self._count('bytes_read', s['bytes'])
+                logger.debug(f'Query cache hit: {len(df)} rows from {path}')
+                return df
+            except Exception as e:
+                logger.warning(f'Dropping unreadable query cache entry {path}: {e}')
+                self._remove(path)
+
+        self._count('misses')
+        df = load()
+        self._store(path, df)
+        return df
+
+    def _store(self, path, df):
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # e.g. object columns Parquet cannot type
+            logger.debug(f'Not caching result: {e}')
+            self._remove(tmp_path)
+            return
+
+        self._count('stores')
+        self._count('bytes_written', os.path.getsize(path))
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits max_bytes.
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                self._remove(path)
+
+    def stats(self):
+        """
+        Hit / miss counters since creation, plus the current size on disk.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            entries = self._entries()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(size for _, size, _ in entries)
+        return stats
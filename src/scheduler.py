@@ -0,0 +1,161 @@
+import logging
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.utils import get_pool
+
+logger = logging.getLogger(__name__)
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+([\w.]+)', re.IGNORECASE)
+
+
+def referenced_tables(sql):
+    """
+    Return the table names referenced after FROM / JOIN in sql, in order.
+    """
+    return list(dict.fromkeys(_TABLE_REF.findall(sql)))
+
+
+def table_dependencies(tables_config):
+    """
+    Map every table in tables_config to the set of tables it depends on.
+    An explicit 'depends_on' list (of config keys or table names) wins,
+    otherwise the tables referenced after FROM / JOIN in its SQL are used.
+    """
+    names = {config['name'].upper(): table for table, config in tables_config.items()}
+    deps = {table: _dependencies(table, tables_config, names) for table in tables_config}
+    _check_acyclic(deps)
+    return deps
+
+
+def _dependencies(table, tables_config, names):
+    config = tables_config[table]
+    explicit = 'depends_on' in config
+    refs = config['depends_on'] if explicit else referenced_tables(config.get('sql', ''))
+
+    deps = set()
+    for ref in refs:
+        dep = ref if ref in tables_config else names.get(ref.rsplit('.', 1)[-1].upper())
+        if dep is None:
+            if explicit:
+                raise ValueError(f'Table "{table}" depends on unknown table "{ref}"')
+            continue
+        if dep != table:
+            deps.add(dep)
+    return deps
+
+
+def upstream_tables(tables_config, tables):
+    """
+    tables plus every table of tables_config they depend on, directly or not.
+    Only the SQL of the tables visited is read.
+    """
+    names = {config['name'].upper(): table for table, config in tables_config.items()}
+    found = set(tables)
+    pending = list(tables)
+    while pending:
+        for dep in _dependencies(pending.pop(), tables_config, names) - found:
+            found.add(dep)
+            pending.append(dep)
+    return found
+
+
+def _check_acyclic(deps):
+    remaining = {table: set(d) for table, d in deps.items()}
+    while remaining:
+        ready = [table for table, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f'Circular table dependencies between: {sorted(remaining)}')
+        for table in ready:
+            del remaining[table]
+        for d in remaining.values():
+            d.difference_update(ready)
+
+
+def _empty_report(report):
+    return {
+        section: {key: type(value)() for key, value in data.items() if key != 'total'}
+        for section, data in report.items()
+    }
+
+
+def _merge_report(report, table_report):
+    for section, data in table_report.items():
+        for key, value in data.items():
+            if isinstance(value, list):
+                report[section][key].extend(value)
+            else:
+                report[section][key].update(value)
+
+
+def _needs_second_connection(config):
+    return bool(config.get('post_process', {}).get('params', {}).get('out_of_core'))
+
+
+def _default_workers(tables_config, pool):
+    if any(_needs_second_connection(config) for config in tables_config.values()):
+        return max(1, pool.max_size // 2)
+    return pool.max_size
+
+
+def run_tables(report, tables_config, run_table, max_workers=None, pool=None):
+    """
+    Run run_table(report, conn, config) for every table, starting a table as
+    soon as all of the tables it depends on have succeeded. Independent
+    tables run concurrently on max_workers threads (the pool size by
+    default), each with its own pooled connection. When a table standardizes
+    out of core, which checks out a second connection to write on, only half
+    the pool is used by default so that connection is always available.
+
+    Each table fills a private report that is merged into report under a
+    lock once it finishes. Tables downstream of a failure are not run and
+    are reported as failed.
+    """
+    pool = pool or get_pool()
+    max_workers = max_workers or _default_workers(tables_config, pool)
+    deps = table_dependencies(tables_config)
+    lock = threading.Lock()
+
+    def run_one(table):
+        config = tables_config[table]
+        table_report = _empty_report(report)
+        try:
+            with pool.connection() as conn:
+                logger.info(f'Running ETL Pipeline for: {table}')
+                run_table(table_report, conn, config)
+            return True
+        except Exception as e:
+            logger.error(f'Error running ETL pipeline for "{table}": {e}')
+            return False
+        finally:
+            with lock:
+                _merge_report(report, table_report)
+
+    pending = dict(deps)
+    done, failed = set(), set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='etl') as executor:
+        while pending or running:
+            for table in [t for t, d in pending.items() if d <= done | failed]:
+                del pending[table]
+                upstream = deps[table] & failed
+                if upstream:
+                    logger.warning(f'Skipping "{table}", upstream table(s) failed: {sorted(upstream)}')
+                    with lock:
+                        report['executed']['failure'][tables_config[table]['name']] = \
+                            f'Skipped, upstream table(s) failed: {", ".join(sorted(upstream))}'
+                    failed.add(table)
+                    continue
+                running[executor.submit(run_one, table)] = table
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                (done if future.result() else failed).add(table)
+
+    return done, failed
@@ -1,44 +1,427 @@
 import importlib
 import logging
 import os
+import queue
+import shutil
+import tempfile
+import threading
 import urllib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
 from decimal import Decimal
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
-import pyodbc
 from tqdm import tqdm
 
-from configs import DB_CONFIG
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
+from configs import DB_CONFIG, configure_worker_logger, log_queue
+from src.backends import connect
+from src.instrumentation import span
 
 logger = logging.getLogger(__name__)
 
 
 def db_conn():
-    return pyodbc.connect(f"DSN={DB_CONFIG['dsn']}")
+    """
+    Connect with the backend configured in DB_CONFIG (Netezza by default, see src.backends).
+    """
+    return connect(DB_CONFIG)
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of database connections.
+
+    Connections are health-checked with a cheap query when checked out, and
+    recycled after max_uses checkouts or when an exception was raised while
+    they were in use. At most max_size connections exist at once; checkout
+    waits timeout seconds for one by default and then raises TimeoutError.
+    """
+    def __init__(self, connect=db_conn, max_size=4, max_uses=100, health_query='SELECT 1', timeout=900):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.health_query = health_query
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._retired = set()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f'Discarding unhealthy pooled connection: {e}')
+            return False
+
+    def _discard(self, conn):
+        self._uses.pop(id(conn), None)
+        self._retired.discard(id(conn))
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def checkout(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f'No pooled connection available after {timeout}s')
+
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    self._uses[id(conn)] = 0
+                    break
+                if self._healthy(conn):
+                    break
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._uses[id(conn)] += 1
+        return conn
+
+    def retire(self, conn):
+        """
+        Discard conn when it is checked in instead of handing it out again,
+        e.g. while a statement that could not be interrupted may still run on it.
+        """
+        self._retired.add(id(conn))
+
+    def checkin(self, conn, broken=False):
+        broken = broken or id(conn) in self._retired
+        try:
+            if not broken:
+                # Never hand out a connection with a transaction still open
+                conn.rollback()
+        except Exception:
+            broken = True
+
+        if broken or self._uses.get(id(conn), 0) >= self.max_uses:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        with pool.connection() as conn: ... checks a connection out and back in.
+        An exception raised while it is in use may have left it in any state,
+        so the connection is discarded then.
+        """
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.checkin(conn, broken=True)
+            raise
+        except BaseException:
+            self.checkin(conn)
+            raise
+        else:
+            self.checkin(conn)
+
+    def close(self):
+        """
+        Close every idle connection.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_QUERY_CACHE = None
+
+def get_pool():
+    """
+    Return the process wide ConnectionPool, created on first use from DB_CONFIG.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ConnectionPool(
+                max_size=DB_CONFIG.get('pool_size', 4),
+                max_uses=DB_CONFIG.get('pool_max_uses', 100),
+                timeout=DB_CONFIG.get('pool_timeout', 900),
+            )
+        return _POOL
+
+def set_pool(pool):
+    """
+    Make pool the process wide ConnectionPool returned by get_pool, closing
+    the idle connections of the previous one.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        previous, _POOL = _POOL, pool
+    if previous is not None and previous is not pool:
+        previous.close()
 
 def db_exec(conn, query):
+    """
+    Execute query and commit. Returns the affected row count when the driver reports one.
+    """
     cus = conn.cursor()
     cus.execute(query)
     conn.commit()
+    return cus.rowcount if cus.rowcount >= 0 else None
 
-def db_get(conn, query):
-    cus = conn.cursor()
-    cus.execute(query)
-    columns = [column[0] for column in cus.description]
-    types = [column[1] for column in cus.description]
-    rows = cus.fetchall()
-
-    data = pd.DataFrame.from_records(rows, columns=columns)
-    for col in data.columns:
-        if all(isinstance(val, Decimal) for val in data[col]):
-            data[col] = data[col].astype(float)
-            
+def table_exists(conn, table_name):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_NAME = '{table_name}'
+        """)
+        return cursor.fetchone()[0] > 0
+
+def fetch_table_ddl(conn, table_name):
+    """
+    Column types and distribution columns of an existing table, read from
+    the Netezza catalog so the table can be recreated with the same DDL:
+        {'column_types': {'COL1': 'CHARACTER VARYING(20)', ...}, 'distribute_on': ['COL1'] or None}
+    column_types is empty when the table does not exist.
+    """
+    columns = db_get(conn, f"""
+    SELECT ATTNAME, FORMAT_TYPE
+    FROM _V_RELATION_COLUMN
+    WHERE NAME = '{table_name}'
+    ORDER BY ATTNUM
+    """)
+    distribution = db_get(conn, f"""
+    SELECT ATTNAME
+    FROM _V_TABLE_DIST_MAP
+    WHERE TABLENAME = '{table_name}'
+    ORDER BY DISTSEQNO
+    """)
+    return {
+        'column_types': dict(zip(columns['ATTNAME'], columns['FORMAT_TYPE'])),
+        'distribute_on': list(distribution['ATTNAME']) or None,
+    }
+
+def ddl_options(conn, table_name, ddl=None, distribute_on=None):
+    """
+    db_write DDL keyword arguments for rewriting table_name from its 'ddl'
+    table config:
+        distribute_on / organize_on: key columns, distribute_on falling back
+                                     to the given default (e.g. the ID column)
+        sized_types: size the column types from the data (default True)
+        preserve: keep the column types and distribution table_name has now
+    Sized or not, the distribute_on / organize_on columns keep the type they
+    have in table_name: joins on a key are only co-located when both sides
+    hash the same type.
+    Must be called before table_name is dropped.
+    """
+    ddl = ddl or {}
+    options = {
+        'distribute_on': ddl.get('distribute_on'),
+        'organize_on': ddl.get('organize_on'),
+        'sized_types': ddl.get('sized_types', True),
+    }
+    if ddl.get('preserve'):
+        original = fetch_table_ddl(conn, table_name)
+        options['column_types'] = original['column_types']
+        options['distribute_on'] = options['distribute_on'] or original['distribute_on']
+    options['distribute_on'] = options['distribute_on'] or distribute_on
+    if options['sized_types'] and 'column_types' not in options:
+        keys = {col.upper() for col in _key_list(options['distribute_on']) + _key_list(options['organize_on'])}
+        current = fetch_table_ddl(conn, table_name)['column_types'] if keys else {}
+        options['column_types'] = {col: col_type for col, col_type in current.items() if col.upper() in keys}
+    return options
+
+def _convert_column(values, type_code, scale, dtype=None, category_ratio=None):
+    """
+    Convert one column of fetched values in a single vectorized pass, driven
+    by its cursor.description type code. dtype overrides the default:
+    'scaled' stores decimals as Int64 of value * 10**scale, 'object' keeps
+    the raw values, anything else is passed to astype.
+    """
+    if dtype == 'object':
+        return pd.Series(values, dtype=object)
+
+    if type_code is Decimal:
+        if dtype == 'scaled':
+            return pd.Series(
+                [None if val is None else int(val.scaleb(scale or 0)) for val in values], dtype='Int64'
+            )
+        data = pd.Series(np.array(values, dtype=np.float64))
+    elif type_code is datetime:
+        data = pd.Series(np.array(values, dtype='datetime64[us]'))
+    elif type_code is date:
+        data = pd.Series(np.array(values, dtype='datetime64[D]'))
+    elif type_code is str:
+        data = pd.Series(values, dtype=object)
+        if category_ratio is not None and dtype is None and len(data):
+            if data.nunique() <= category_ratio * len(data):
+                data = data.astype('category')
+    else:
+        data = pd.Series(values)
+
+    if dtype is not None:
+        data = data.astype(dtype)
     return data
 
+def _records_to_frame(rows, description, dtypes=None, category_ratio=None):
+    """
+    Build a DataFrame from fetched rows column by column.
+    See _convert_column for dtypes and category_ratio.
+    """
+    dtypes = dtypes or {}
+    columns = [column[0] for column in description]
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+
+    data = {
+        column[0]: _convert_column(col_values, column[1], column[5], dtypes.get(column[0]), category_ratio)
+        for column, col_values in zip(description, values)
+    }
+    return pd.DataFrame(data, columns=columns)
+
+def _require_arrow():
+    if pa is None:
+        raise ImportError('The Arrow data path requires the pyarrow package')
+
+def _arrow_column(values, type_code):
+    """
+    Arrow array of one fetched column, typed from its cursor.description
+    type code like _convert_column: decimals become float64.
+    """
+    if type_code is Decimal:
+        return pa.array(values).cast(pa.float64())
+    arrow_type = {
+        int: pa.int64(), float: pa.float64(), bool: pa.bool_(), str: pa.string(),
+        date: pa.date32(), datetime: pa.timestamp('us'), bytes: pa.binary(), bytearray: pa.binary(),
+    }.get(type_code)
+    return pa.array(values, type=arrow_type)
+
+def db_get_arrow(conn, query, batch_size=100_000):
+    """
+    Run query and return the result as a pyarrow Table, converting
+    batch_size fetched rows at a time into a record batch, so no pandas
+    object columns are ever built.
+    """
+    _require_arrow()
+    with span('db_get') as s:
+        cus = conn.cursor()
+        try:
+            cus.execute(query)
+            description = cus.description
+            names = [column[0] for column in description]
+
+            batches = []
+            while True:
+                rows = cus.fetchmany(batch_size)
+                if not rows:
+                    break
+                arrays = [
+                    _arrow_column(list(values), column[1])
+                    for column, values in zip(description, zip(*rows))
+                ]
+                batches.append(pa.RecordBatch.from_arrays(arrays, names=names))
+        finally:
+            cus.close()
+
+        if batches:
+            table = pa.Table.from_batches(batches)
+        else:
+            table = pa.table({name: _arrow_column([], column[1]) for name, column in zip(names, description)})
+        s['rows'] = table.num_rows
+        s['bytes'] = table.nbytes
+    return table
+
+def set_query_cache(cache):
+    """
+    Serve db_get from cache (a src.query_cache.QueryCache), None to disable.
+    """
+    global _QUERY_CACHE
+    _QUERY_CACHE = cache
+
+def get_query_cache():
+    return _QUERY_CACHE
+
+def db_get(conn, query, dtypes=None, category_ratio=None, dtype_backend=None):
+    """
+    Run query and return the result as a DataFrame.
+    Decimals become float64, dates and timestamps datetime64; dtypes maps
+    column names to overrides and category_ratio turns string columns with at
+    most that share of distinct values into categoricals.
+    dtype_backend='pyarrow' returns pyarrow backed columns from db_get_arrow
+    instead (dtypes and category_ratio do not apply).
+    Results come from the query cache when one is set (see set_query_cache).
+    """
+    cache = _QUERY_CACHE
+    if cache is not None:
+        options = {'dtypes': dtypes, 'category_ratio': category_ratio, 'dtype_backend': dtype_backend}
+        return cache.fetch(conn, query, lambda: _db_get(conn, query, dtypes, category_ratio, dtype_backend), options)
+    return _db_get(conn, query, dtypes, category_ratio, dtype_backend)
+
+def _db_get(conn, query, dtypes=None, category_ratio=None, dtype_backend=None):
+    if dtype_backend == 'pyarrow':
+        return db_get_arrow(conn, query).to_pandas(types_mapper=pd.ArrowDtype)
+
+    with span('db_get') as s:
+        cus = conn.cursor()
+        cus.execute(query)
+        description = cus.description
+        rows = cus.fetchall()
+
+        df = _records_to_frame(rows, description, dtypes, category_ratio)
+        s['rows'] = len(df)
+        s['bytes'] = int(df.memory_usage(index=False).sum())
+    return df
+
+def db_get_chunks(conn, query, chunk_size=100_000, dtypes=None):
+    """
+    Streaming variant of db_get.
+    Yields one DataFrame per chunk_size rows fetched with fetchmany, so only
+    a single chunk of raw rows is held in memory at a time. A query without
+    rows yields one empty DataFrame with the result's columns.
+    There is no category_ratio: decided per chunk, the same column would be
+    categorical in some chunks and not others, with different categories.
+    """
+    cus = conn.cursor()
+    try:
+        cus.execute(query)
+        description = cus.description
+
+        yielded = False
+        while True:
+            rows = cus.fetchmany(chunk_size)
+            if not rows:
+                break
+            yielded = True
+            yield _records_to_frame(rows, description, dtypes)
+
+        if not yielded:
+            yield _records_to_frame([], description, dtypes)
+    finally:
+        cus.close()
+
+@lru_cache(maxsize=None)
 def load_function(func_name: str):
     """
     Dynamically loads and returns a function object from a string reference.
     Example func_name: 'etl.post_processing.users_post_process'
+    Lookups are memoized, so every function is only resolved once per run.
     """
     module_name, function_name = func_name.rsplit('.', 1)
     module = importlib.import_module(module_name)
@@ -59,50 +442,165 @@ def infer_sql_type(dtype):
         return "INT"
     elif "float" in str(dtype).lower() or "double" in str(dtype).lower():
         return "FLOAT"
-    elif "datetime" in str(dtype).lower():
+    elif "date" in str(dtype).lower() or "timestamp" in str(dtype).lower():
         return "DATE"
     # Fallback for objects or strings
     return "VARCHAR(255)"
 
-def generate_create_table_sql(df, table_name):
+_SMALLINT_MAX = 2**15 - 1
+_INT_MAX = 2**31 - 1
+_NUMERIC_MAX_PRECISION = 38
+_VARCHAR_MIN, _VARCHAR_MAX = 16, 64_000
+_DISTRIBUTION_MAX_COLUMNS = 4
+
+def _varchar_length(length):
+    """
+    Declared VARCHAR length for strings of up to length characters: the
+    next power of two, so a few longer values in the next load still fit.
+    """
+    return min(max(1 << (max(length, 1) - 1).bit_length(), _VARCHAR_MIN), _VARCHAR_MAX)
+
+def _numeric_type(values):
+    """
+    NUMERIC(p,s) holding every Decimal in values.
+    """
+    int_digits, scale = 1, 0
+    for val in values:
+        if not val.is_finite():
+            continue
+        _, digits, exponent = val.as_tuple()
+        int_digits = max(int_digits, len(digits) + exponent)
+        scale = max(scale, -exponent)
+    precision = min(int_digits + scale, _NUMERIC_MAX_PRECISION)
+    return f"NUMERIC({precision},{min(scale, precision - 1)})"
+
+def sized_sql_type(values):
+    """
+    Netezza column type sized from the data of the Series values:
+    SMALLINT / INT / BIGINT by range, DATE or TIMESTAMP depending on whether
+    any value has a time of day, NUMERIC(p,s) for Decimals, FLOAT for floats
+    and VARCHAR(n) fitting the longest string otherwise.
+    """
+    present = values.dropna()
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return f"VARCHAR({_VARCHAR_MIN})"
+    if pd.api.types.is_integer_dtype(values.dtype):
+        if present.empty:
+            return "INT"
+        low, high = int(present.min()), int(present.max())
+        if -_SMALLINT_MAX <= low and high <= _SMALLINT_MAX:
+            return "SMALLINT"
+        if -_INT_MAX <= low and high <= _INT_MAX:
+            return "INT"
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(values.dtype):
+        return "FLOAT"
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return "DATE" if (present == present.dt.normalize()).all() else "TIMESTAMP"
+
+    value_types = set(present.map(type))
+    if value_types and all(issubclass(t, Decimal) for t in value_types):
+        return _numeric_type(present)
+    if value_types and all(issubclass(t, datetime) for t in value_types):
+        return "TIMESTAMP"
+    if value_types and all(issubclass(t, date) for t in value_types):
+        return "DATE"
+    length = int(present.astype(str).str.len().max()) if len(present) else 0
+    return f"VARCHAR({_varchar_length(length)})"
+
+def sql_column_types(df, sized_types=False, column_types=None):
+    """
+    Netezza type of every column of df, in order. column_types (e.g. the
+    original table's, see fetch_table_ddl) wins where it has the column;
+    the others are sized from the data (sized_sql_type) when sized_types is
+    set, or mapped from their dtype (infer_sql_type).
+
+    Only size the types of a table that is written in one go: rows inserted
+    into it later may not fit.
+    """
+    column_types = column_types or {}
+    types = {}
+    for col in df.columns:
+        if col in column_types:
+            types[col] = column_types[col]
+        elif sized_types:
+            types[col] = sized_sql_type(df[col])
+        else:
+            types[col] = infer_sql_type(df[col].dtype)
+    return types
+
+def _key_list(columns):
+    """
+    The columns of a distribute_on / organize_on value, none for RANDOM.
+    """
+    if not columns or (isinstance(columns, str) and columns.upper() == 'RANDOM'):
+        return []
+    return [columns] if isinstance(columns, str) else list(columns)
+
+def _key_columns(df, table_name, columns, clause):
+    if isinstance(columns, str):
+        columns = [columns]
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f'{clause} columns {missing} are not columns of {table_name}')
+    if len(columns) > _DISTRIBUTION_MAX_COLUMNS:
+        raise ValueError(f'{clause} takes at most {_DISTRIBUTION_MAX_COLUMNS} columns, got {columns}')
+    return ', '.join(columns)
+
+def generate_create_table_sql(df, table_name, column_types=None, distribute_on=None, organize_on=None):
     """
     Dynamically generate a CREATE TABLE statement for Netezza based on a DataFrame's columns and dtypes.
+    column_types overrides the type of some or all columns (see sql_column_types).
+    distribute_on is a list of columns or 'RANDOM', organize_on a list of columns;
+    without them the appliance's default distribution is used.
     Example result:
         CREATE TABLE my_table (
             col1 INT,
             col2 VARCHAR(255),
             col3 TIMESTAMP
         )
+        DISTRIBUTE ON (col1)
     """
+    column_types = column_types or {}
     cols_defs = []
     for col in df.columns:
-        col_type = infer_sql_type(df[col].dtype)
+        col_type = column_types.get(col) or infer_sql_type(df[col].dtype)
         col_def = f"{col} {col_type}"
         cols_defs.append(col_def)
 
     cols_str = ",\n  ".join(cols_defs)
     create_stmt = f"CREATE TABLE {table_name} (\n  {cols_str}\n)"
+    if isinstance(distribute_on, str) and distribute_on.upper() == 'RANDOM':
+        create_stmt += "\nDISTRIBUTE ON RANDOM"
+    elif distribute_on:
+        create_stmt += f"\nDISTRIBUTE ON ({_key_columns(df, table_name, distribute_on, 'DISTRIBUTE ON')})"
+    if organize_on:
+        create_stmt += f"\nORGANIZE ON ({_key_columns(df, table_name, organize_on, 'ORGANIZE ON')})"
     return create_stmt
 
-def generate_create_ext_table_sql(df, table_name, file_path):
+def generate_create_ext_table_sql(df, table_name, file_path, column_types=None, suffix='_EXT'):
     """
-    Dynamically generate a CREATE TABLE statement for Netezza based on a DataFrame's columns and dtypes.
+    Dynamically generate a CREATE EXTERNAL TABLE statement for Netezza reading
+    file_path, with the same column types as generate_create_table_sql.
+    The external table is named table_name + suffix.
     Example result:
-        CREATE TABLE my_table (
+        CREATE EXTERNAL TABLE my_table_EXT (
             col1 INT,
             col2 VARCHAR(255),
             col3 TIMESTAMP
         )
+        USING (...)
     """
+    column_types = column_types or {}
     cols_defs = []
     for col in df.columns:
-        col_type = infer_sql_type(df[col].dtype)
+        col_type = column_types.get(col) or infer_sql_type(df[col].dtype)
         col_def = f"{col} {col_type}"
         cols_defs.append(col_def)
 
     cols_str = ",\n  ".join(cols_defs)
     create_stmt = f"""
-    CREATE EXTERNAL TABLE {table_name}_EXT (
+    CREATE EXTERNAL TABLE {table_name}{suffix} (
         {cols_str}
     )
     USING (
@@ -114,7 +612,56 @@ def generate_create_ext_table_sql(df, table_name, file_path):
     """
     return create_stmt
 
-def csv_write(df, df_path, chunk_size=None):
+def csv_write(df, df_path, chunk_size=None, use_arrow=False):
+    with span('csv_write', rows=len(df)) as s:
+        if use_arrow:
+            with open(df_path, 'wb') as f:
+                arrow_csv_write(df, f, chunk_size)
+        else:
+            _csv_write(df, df_path, chunk_size)
+        s['bytes'] = os.path.getsize(df_path)
+
+def _to_arrow(df):
+    """
+    df as a pyarrow Table shaped for the load CSV. Datetimes without a time
+    of day become dates, matching the DATE columns of generate_create_table_sql
+    (others are written with microseconds for TIMESTAMP columns), and object
+    columns Arrow cannot write as CSV (e.g. tuples) are written as their str().
+    pyarrow backed columns are not copied.
+    """
+    arrays = []
+    for col in df.columns:
+        try:
+            array = pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = None
+        if array is None or pa.types.is_nested(array.type):
+            array = pa.array(df[col].astype(str).where(df[col].notna()), from_pandas=True)
+        if pa.types.is_timestamp(array.type):
+            dates = array.cast(pa.date32(), safe=False)
+            if array.cast(pa.timestamp('us')).equals(dates.cast(pa.timestamp('us'))):
+                array = dates
+            else:
+                array = array.cast(pa.timestamp('us'), safe=False)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=[str(col) for col in df.columns])
+
+def arrow_csv_write(df, f, chunk_size=None, cancelled=None):
+    """
+    Write df with a header to the binary file f, serializing straight from
+    Arrow buffers instead of formatting every value in Python.
+    Stops early once the cancelled event is set.
+    """
+    _require_arrow()
+    table = _to_arrow(df)
+    options = pacsv.WriteOptions(quoting_style='needed')
+    with pacsv.CSVWriter(f, table.schema, write_options=options) as writer:
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            if cancelled is not None and cancelled.is_set():
+                return
+            writer.write_batch(batch)
+
+def _csv_write(df, df_path, chunk_size=None):
     if chunk_size is None:
         df.to_csv(df_path, index=False, header=True)
         return
@@ -132,7 +679,150 @@ def csv_write(df, df_path, chunk_size=None):
                 chunk.to_csv(f, index=False, header=False, mode='a')
                 pbar.update(1)
 
-def db_write(df, table_name, batch_size=100_000):
+def _split_rows(n_rows, parts, min_part_rows):
+    """
+    Bounds of at most parts contiguous row ranges of at least min_part_rows
+    rows each (a single range for small frames).
+    """
+    parts = max(1, min(parts, n_rows // max(min_part_rows, 1)))
+    bounds = np.linspace(0, n_rows, parts + 1).astype(np.int64)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _write_part(df, path, use_arrow=False):
+    """
+    Process pool task of csv_write_parts: write one part with its header.
+    """
+    if use_arrow:
+        with open(path, 'wb') as f:
+            arrow_csv_write(df, f)
+    else:
+        df.to_csv(path, index=False, header=True)
+    return os.path.getsize(path)
+
+def csv_write_parts(df, directory, parts, use_arrow=False, min_part_rows=100_000):
+    """
+    Write df as up to parts CSV files part_<i>.csv in directory, each with a
+    header, formatted in parallel in a process pool. Returns the paths in
+    row order. Frames too small to split are written in this process.
+    """
+    ranges = _split_rows(len(df), parts, min_part_rows)
+    paths = [os.path.join(directory, f'part_{i}.csv') for i in range(len(ranges))]
+
+    with span('csv_write', rows=len(df), parts=len(paths)) as s:
+        if len(paths) == 1:
+            s['bytes'] = _write_part(df, paths[0], use_arrow)
+            return paths
+
+        workers = min(len(paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(workers, initializer=configure_worker_logger, initargs=(log_queue(),)) as executor:
+            futures = [
+                executor.submit(_write_part, df.iloc[start:stop], path, use_arrow)
+                for (start, stop), path in zip(ranges, paths)
+            ]
+            s['bytes'] = sum(future.result() for future in futures)
+    return paths
+
+def _load_external_parts(cursor, df, table_name, paths, column_types=None):
+    """
+    Load the part files of csv_write_parts with one external table per part,
+    read together by a single INSERT ... UNION ALL so the appliance pulls
+    them in concurrently. The external tables are <table_name>_EXT<i>.
+    """
+    if len(paths) == 1:
+        _load_external_table(cursor, df, table_name, paths[0], column_types)
+        return
+
+    ext_tables = [f'{table_name}_EXT{i}' for i in range(len(paths))]
+    with span('external_load', rows=len(df), parts=len(paths)) as s:
+        for i, path in enumerate(paths):
+            sql = generate_create_ext_table_sql(df, table_name, path, column_types, suffix=f'_EXT{i}')
+            cursor.execute(f'DROP TABLE {ext_tables[i]} IF EXISTS')
+            cursor.execute(sql)
+        logger.debug(f'Created {len(paths)} external tables')
+
+        union = '\n    UNION ALL '.join(f'SELECT * FROM {ext_table}' for ext_table in ext_tables)
+        cursor.execute(f'INSERT INTO {table_name}\n    {union}')
+        s['bytes'] = sum(os.path.getsize(path) for path in paths)
+
+        for ext_table in ext_tables:
+            cursor.execute(f'DROP TABLE {ext_table} IF EXISTS')
+    logger.debug('Finished Insert')
+
+def _load_external_table(cursor, df, table_name, data_path, column_types=None):
+    with span('external_load', rows=len(df)) as s:
+        # Create an external table pointing to the CSV
+        sql = generate_create_ext_table_sql(df, table_name, data_path, column_types)
+        file_write(sql, f'tmp/{table_name}_create_ext.sql')
+        cursor.execute(sql)
+        logger.debug('Create External Table DDL Executed')
+
+        # Load data from the external table into the main table
+        cursor.execute(f"INSERT INTO {table_name} SELECT * FROM {table_name}_EXT")
+        if os.path.isfile(data_path):
+            s['bytes'] = os.path.getsize(data_path)
+    logger.debug('Finished Insert')
+
+@contextmanager
+def csv_pipe(df, chunk_size=100_000, use_arrow=False):
+    """
+    Stream df as CSV through a named pipe instead of a file on disk.
+    Yields the FIFO path; a writer thread fills it chunk by chunk while the
+    consumer (e.g. the DATAOBJECT of an external table) reads it, so
+    serialization and load overlap. If the consumer stops early the writer
+    is cancelled, and a writer error is raised once the pipe is done.
+    use_arrow serializes with arrow_csv_write.
+    """
+    pipe_dir = tempfile.mkdtemp()
+    pipe_path = os.path.join(pipe_dir, 'data.csv')
+    os.mkfifo(pipe_path)
+
+    cancelled = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            if use_arrow:
+                with open(pipe_path, 'wb') as f:
+                    arrow_csv_write(df, f, chunk_size, cancelled)
+                return
+            with open(pipe_path, 'w', newline='') as f:
+                f.write(','.join(df.columns) + '\n')
+                for i in range(0, len(df), chunk_size):
+                    if cancelled.is_set():
+                        return
+                    df.iloc[i:i + chunk_size].to_csv(f, index=False, header=False)
+        except BrokenPipeError:
+            if not cancelled.is_set():
+                errors.append(BrokenPipeError(f'Reader of {pipe_path} closed the pipe early'))
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=writer, name='csv_pipe_writer', daemon=True)
+    thread.start()
+    try:
+        yield pipe_path
+    finally:
+        if thread.is_alive():
+            # Nobody is reading anymore, unblock and drain the writer
+            cancelled.set()
+            fd = os.open(pipe_path, os.O_RDONLY | os.O_NONBLOCK)
+            try:
+                while thread.is_alive():
+                    try:
+                        os.read(fd, 1 << 16)
+                    except BlockingIOError:
+                        pass
+                    thread.join(0.01)
+            finally:
+                os.close(fd)
+        os.remove(pipe_path)
+        os.rmdir(pipe_dir)
+
+    if errors:
+        raise errors[0]
+
+def db_write(df, table_name, batch_size=100_000, use_pipe=False, conn=None, use_arrow=False,
+             column_types=None, sized_types=False, distribute_on=None, organize_on=None, parts=None):
     """
     Overwrite (replace) an existing table in Netezza with the contents of df
     using row-by-row inserts in batches. Utilizes fast_executemany for efficiency.
@@ -141,11 +831,26 @@ def db_write(df, table_name, batch_size=100_000):
     :param df: pandas DataFrame to insert
     :param table_name: name of the table to overwrite
     :param batch_size: number of rows per batch (tune this for performance)
+    :param use_pipe: stream the CSV through a named pipe (see csv_pipe) instead of a
+                     temporary file private to this call
+    :param conn: connection to write with, checked out of the pool when not given
+    :param use_arrow: serialize the CSV from Arrow buffers (see arrow_csv_write)
+    :param column_types: column types overriding the inferred ones (see sql_column_types)
+    :param sized_types: size the column types from the data instead of the dtypes
+    :param distribute_on: DISTRIBUTE ON columns, or 'RANDOM'
+    :param organize_on: ORGANIZE ON columns
+    :param parts: number of CSV part files written in parallel and loaded together
+                  (see csv_write_parts), DB_CONFIG['write_parts'] or 1 by default
     """
+    if conn is None:
+        with get_pool().connection() as pooled:
+            return db_write(
+                df, table_name, batch_size, use_pipe, pooled, use_arrow,
+                column_types, sized_types, distribute_on, organize_on, parts
+            )
+    parts = parts or DB_CONFIG.get('write_parts', 1)
+
     logger.debug('Starting to write df to db')
-    conn = db_conn()
-    df_path = 'tmp.csv'
-    df_path = os.path.abspath(df_path)
 
     # 1. Drop existing table
     drop_sql = f"""
@@ -157,35 +862,58 @@ def db_write(df, table_name, batch_size=100_000):
     conn.commit()
 
     # 2. Create new table dynamically
-    sql = generate_create_table_sql(df, table_name)
-    file_write(sql, 'tmp/create.sql')
+    if sized_types:
+        # Key columns keep their dtype type, a right-sized key breaks co-located joins
+        key_types = {
+            col: infer_sql_type(df[col].dtype)
+            for col in _key_list(distribute_on) + _key_list(organize_on) if col in df.columns
+        }
+        column_types = {**key_types, **(column_types or {})}
+    column_types = sql_column_types(df, sized_types, column_types)
+    sql = generate_create_table_sql(df, table_name, column_types, distribute_on, organize_on)
+    file_write(sql, f'tmp/{table_name}_create.sql')
     cursor.execute(sql)
     conn.commit()
     logger.debug('Create DDL Executed')
 
-    # 3. Save df to a file (alternative to df.to_csv to show progress)
-    logger.debug('Starting CSV write')
-    csv_write(df, df_path, batch_size)
-    logger.debug('Saved to CSV')
+    if use_pipe and hasattr(os, 'mkfifo'):
+        # 3-5. Load through an external table reading the pipe while it is written
+        logger.debug('Starting CSV stream')
+        with csv_pipe(df, batch_size, use_arrow) as pipe_path:
+            _load_external_table(cursor, df, table_name, pipe_path, column_types)
+        conn.commit()
+        logger.debug('Commited Insert')
+    elif parts > 1 and len(df) >= 2 * batch_size:
+        # 3-5. Format part files in parallel and load them through one external table each
+        parts_dir = tempfile.mkdtemp(prefix=f'{table_name}_')
+        try:
+            logger.debug(f'Starting CSV write in up to {parts} parts')
+            paths = csv_write_parts(df, parts_dir, parts, use_arrow, batch_size)
+            logger.debug(f'Saved {len(paths)} CSV parts')
+            _load_external_parts(cursor, df, table_name, paths, column_types)
+            conn.commit()
+            logger.debug('Commited Insert')
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    else:
+        # 3. Save df to a file of its own, tables are written concurrently
+        fd, df_path = tempfile.mkstemp(prefix=f'{table_name}_', suffix='.csv')
+        os.close(fd)
+        try:
+            logger.debug('Starting CSV write')
+            csv_write(df, df_path, batch_size, use_arrow)
+            logger.debug('Saved to CSV')
 
-    # 4. Create an external table pointing to the CSV
-    sql = generate_create_ext_table_sql(df, table_name, df_path)
-    file_write(sql, 'tmp/create_ext.sql')
-    cursor.execute(sql)
-    logger.debug('Create External Table DDL Executed')
-    
-    # 5. Load data from the external table into the main table
-    cursor.execute(f"INSERT INTO {table_name} SELECT * FROM {table_name}_EXT")
-    logger.debug('Finished Insert')
-    conn.commit()
-    logger.debug('Commited Insert')
+            # 4-5. Load the CSV through an external table
+            _load_external_table(cursor, df, table_name, df_path, column_types)
+            conn.commit()
+            logger.debug('Commited Insert')
+        finally:
+            os.remove(df_path)
 
     # 6. Clean up
-    os.remove(df_path)
     cursor.execute(f"DROP TABLE {table_name}_EXT IF EXISTS")
     conn.commit()
     logger.debug('Cleaned up')
 
-    # Close connection
-    cursor.close()
-    conn.close()
\ No newline at end of file
+    cursor.close()
\ No newline at end of file
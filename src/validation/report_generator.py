@@ -49,6 +49,31 @@ def print_section_summary(section_name, section_data, console_output, file_outpu
             console_output.append(colorize(skipped_detail, Fore.YELLOW, use_color))
             file_output.append(skipped_detail)
 
+def print_stage_summary(summary, console_output, file_output, use_color, top=10):
+    header = f"\nSlowest Stages (top {min(top, len(summary))} of {len(summary)}):"
+    console_output.append(colorize(header, Fore.CYAN, use_color))
+    file_output.append(header)
+    for total in summary[:top]:
+        table = total["table"] or "-"
+        rows = total["rows"] if total["rows"] else "-"
+        mb = f'{total["bytes"] / 2**20:.1f} MB' if total["bytes"] else "-"
+        detail = f'   - {table} / {total["stage"]}: {total["seconds"]:.2f}s, rows: {rows}, bytes: {mb}'
+        console_output.append(detail)
+        file_output.append(detail)
+
+def print_cache_summary(stats, console_output, file_output, use_color):
+    header = "\nQuery Cache:"
+    console_output.append(colorize(header, Fore.CYAN, use_color))
+    file_output.append(header)
+    ratio = f'{stats["hit_ratio"]:.0%}' if stats["hit_ratio"] is not None else "-"
+    detail = (
+        f'   - {stats["hits"]} hits, {stats["misses"]} misses ({ratio} hit ratio), '
+        f'{stats["uncacheable"]} uncacheable, {stats["evictions"]} evictions, '
+        f'{stats["entries"]} entries ({stats["bytes"] / 2**20:.1f} MB)'
+    )
+    console_output.append(detail)
+    file_output.append(detail)
+
 def generate_report(report, use_color=True):
     """
     Generates a structured report summarizing the ETL pipeline and validations.
@@ -112,15 +137,24 @@ def generate_report(report, use_color=True):
     #     use_color
     # )
 
+    # Stage Timings Summary
+    if report.get("stages"):
+        print_stage_summary(report["stages"]["summary"], console_output, file_output, use_color)
+
+    # Query Cache Summary
+    if report.get("query_cache"):
+        print_cache_summary(report["query_cache"], console_output, file_output, use_color)
+
     # Overall Summary
     console_output.append("\n===== Pipeline Summary =====")
     file_output.append("\n===== Pipeline Summary =====")
     total_successes = (
         len(report["executed"]["success"]) +
+        len(report["executed"].get("skipped", [])) +
         len(report["table_creation"]["success"]) +
         len(report["primary_key_validation"]["success"])
     )
-    if total_successes == sum(x['total'] for x in report.values()):
+    if total_successes == sum(x['total'] for x in report.values() if 'total' in x):
         pass_message = "Pipeline Status: PASS"
         console_output.append(colorize(pass_message, Fore.GREEN))
         file_output.append(pass_message)
@@ -1,6 +1,11 @@
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-from src.utils import db_get, load_function
+from src.instrumentation import span
+from src.utils import db_get, get_pool, load_function
 
 from configs import TABLES_CONFIG
 
@@ -34,6 +39,64 @@ def validate_table_exists(report, conn, table_name):
     return exists
 
 
+def fetch_catalog(conn, table_names):
+    """
+    Fetches the columns and approximate row count of every table in
+    table_names with a single catalog query. Tables that do not exist are
+    missing from the result.
+    """
+    if not table_names:
+        return {}
+
+    names = ', '.join(f"'{name}'" for name in table_names)
+    query = f"""
+    SELECT c.TABLE_NAME, c.COLUMN_NAME, t.RELTUPLES
+    FROM INFORMATION_SCHEMA.COLUMNS c
+    LEFT JOIN _V_TABLE t ON t.TABLENAME = c.TABLE_NAME
+    WHERE c.TABLE_NAME IN ({names})
+    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+    """
+    catalog = {}
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        for table_name, column_name, row_count in cursor.fetchall():
+            entry = catalog.setdefault(table_name, {'columns': [], 'row_count': row_count})
+            entry['columns'].append(column_name)
+
+    return catalog
+
+
+def validate_table_exists_cached(report, catalog, table_name):
+    """
+    Same as validate_table_exists, served from a fetch_catalog result.
+    """
+    exists = table_name in catalog
+
+    if exists:
+        logger.success(f"Table '{table_name}' exists (~{catalog[table_name]['row_count']} rows).")
+        report["table_creation"]["success"].append(table_name)
+    else:
+        logger.error(f"Table '{table_name}' does not exist.")
+        report["table_creation"]["failure"][table_name] = "Table does not exist."
+
+    return exists
+
+
+def validate_primary_key_columns(report, catalog, table_name, pks):
+    """
+    Checks that every expected primary key column is still in the table.
+    Updates the report on failure.
+    """
+    columns = {col.upper() for col in catalog[table_name]['columns']}
+    missing = [pk for pk in pks if pk.upper() not in columns]
+
+    if missing:
+        logger.error(f"Primary key columns {missing} are missing from '{table_name}'.")
+        report["primary_key_validation"]["failure"][table_name] = f"Missing primary key columns: {', '.join(missing)}"
+        return False
+    return True
+
+
 def validate_primary_key_uniqueness(report, conn, table_name, pks):
     """
     Validates that the primary key column is unique.
@@ -59,10 +122,109 @@ def validate_primary_key_uniqueness(report, conn, table_name, pks):
         return False
 
 
-def generic_validator(report, conn, config):
+def build_profile_query(table_name, pks, date_cols=()):
+    """
+    Builds one aggregate query that profiles a table in a single scan.
+    Rows are grouped by the primary key, and the groups are rolled up into
+    scalar metrics only (row count, distinct and duplicate keys, nulls per
+    key column and min/max of each date column).
+    """
+    pks_str = ', '.join(pks)
+    inner = [pks_str, 'COUNT(*) AS CNT']
+    outer = [
+        'SUM(CNT) AS ROW_COUNT',
+        'COUNT(*) AS DISTINCT_PKS',
+        'SUM(CASE WHEN CNT > 1 THEN 1 ELSE 0 END) AS DUPLICATE_PKS',
+    ]
+    for i, pk in enumerate(pks):
+        outer.append(f'SUM(CASE WHEN {pk} IS NULL THEN CNT ELSE 0 END) AS NULLS_{i}')
+    for i, col in enumerate(date_cols):
+        inner += [f'MIN({col}) AS MIN_{i}', f'MAX({col}) AS MAX_{i}']
+        outer += [f'MIN(MIN_{i}) AS MIN_{i}', f'MAX(MAX_{i}) AS MAX_{i}']
+
+    inner_str = ',\n            '.join(inner)
+    outer_str = ',\n        '.join(outer)
+    return f"""
+    SELECT
+        {outer_str}
+    FROM (
+        SELECT
+            {inner_str}
+        FROM {table_name}
+        GROUP BY {pks_str}
+    ) g
+    """
+
+
+def profile_table(conn, table_name, pks, date_cols=(), duplicate_sample=0):
+    """
+    Runs build_profile_query and returns its metrics as a dict. When there
+    are duplicate keys, up to duplicate_sample of them are fetched as well.
+    """
+    with span('validate_profile', table=table_name) as s, conn.cursor() as cursor:
+        cursor.execute(build_profile_query(table_name, pks, date_cols))
+        row = cursor.fetchone()
+        s['rows'] = int(row[0] or 0)
+
+    row_count, distinct_pks, duplicate_pks = (int(val or 0) for val in row[:3])
+    nulls = row[3:3 + len(pks)]
+    ranges = row[3 + len(pks):]
+    metrics = {
+        'row_count': row_count,
+        'distinct_pks': distinct_pks,
+        'duplicate_pks': duplicate_pks,
+        'null_pks': {pk: int(val or 0) for pk, val in zip(pks, nulls)},
+        'date_ranges': {col: (ranges[2 * i], ranges[2 * i + 1]) for i, col in enumerate(date_cols)},
+    }
+
+    if duplicate_pks and duplicate_sample:
+        pks_str = ', '.join(pks)
+        metrics['duplicate_sample'] = db_get(conn, f"""
+        SELECT {pks_str}, COUNT(*) AS CNT
+        FROM {table_name}
+        GROUP BY {pks_str}
+        HAVING COUNT(*) > 1
+        LIMIT {int(duplicate_sample)}
+        """).to_dict('records')
+
+    return metrics
+
+
+def validate_table_profile(report, conn, table_name, pks, date_cols=(), duplicate_sample=0):
+    """
+    Validates primary key uniqueness from a single-scan table profile
+    instead of pulling every duplicate group over the wire.
+    Updates the report with the result and the metrics.
+    """
+    metrics = profile_table(conn, table_name, pks, date_cols, duplicate_sample)
+    report["primary_key_validation"].setdefault("metrics", {})[table_name] = metrics
+
+    for pk, nulls in metrics['null_pks'].items():
+        if nulls:
+            logger.warning(f"Primary key column '{pk}' of '{table_name}' has {nulls} NULL values.")
+
+    duplicates = metrics['duplicate_pks']
+    if duplicates == 0:
+        logger.success(f"Primary key validation passed for '{table_name}' ({metrics['row_count']} rows).")
+        report["primary_key_validation"]["success"].append(table_name)
+        return True
+    else:
+        logger.error(f"Primary key validation failed for '{table_name}'. {duplicates} Duplicate values found.")
+        report["primary_key_validation"]["failure"][table_name] = f"{duplicates} Duplicate primary key values found."
+        return False
+
+
+def generic_validator(report, conn, config, catalog=None):
+    with span('generic_validator', table=config['name']):
+        _generic_validator(report, conn, config, catalog)
+
+def _generic_validator(report, conn, config, catalog=None):
     table_name = config['name']
 
-    table_exists = validate_table_exists(report, conn, table_name)
+    if catalog is None:
+        table_exists = validate_table_exists(report, conn, table_name)
+    else:
+        table_exists = validate_table_exists_cached(report, catalog, table_name)
 
     # Skip primary key validation if the table does not exist
     if not table_exists:
@@ -72,23 +234,165 @@ def generic_validator(report, conn, config):
 
     # Validate primary key uniqueness
     pks = config.get("exp_pks")
+    if pks and catalog is not None and not validate_primary_key_columns(report, catalog, table_name, pks):
+        return
     if pks:
-        validate_primary_key_uniqueness(report, conn, table_name, pks)
+        profile = config.get("profile", {})
+        validate_table_profile(
+            report, conn, table_name, pks,
+            profile.get("date_cols", ()), profile.get("duplicate_sample", 0)
+        )
+
+def generic_validator_batch(report, conn, tables_config):
+    """
+    Runs generic_validator for every table, serving the existence and
+    schema checks from one catalog query for the whole run.
+    """
+    with span('fetch_catalog') as s:
+        catalog = fetch_catalog(conn, [config['name'] for config in tables_config.values()])
+        s['rows'] = len(catalog)
+    for config in tables_config.values():
+        generic_validator(report, conn, config, catalog)
+
+def _run_custom_test(report, conn, table_name, func_path, timeout=None):
+    """
+    Runs one custom test, with the connection's query timeout set to timeout
+    so that a stuck query fails instead of holding the connection forever.
+    """
+    test = load_function(func_path)
+    with span('custom_test', table=table_name, test=func_path):
+        if timeout is None:
+            return test(report, conn, table_name)
 
-def custom_validator(report, conn, config):
+        previous = conn.timeout
+        conn.timeout = max(1, int(timeout))
+        try:
+            return test(report, conn, table_name)
+        finally:
+            conn.timeout = previous
+
+
+def custom_validator(report, conn, config, pool=None, timeout=None, max_workers=4):
+    """
+    Runs the table's custom tests concurrently and records their wall-clock
+    time in report['custom_tests']['timings'].
+
+    One runner uses conn, up to max_workers - 1 more use connections that are
+    idle in the pool at the time (never waiting for one, so tests cannot
+    starve the builds of other tables). Every runner takes the next test from
+    a shared queue until none are left.
+
+    A test fails when it raises or runs longer than timeout seconds (the
+    table's 'custom_test_timeout' wins). An overdue test is reported right
+    away and cannot be interrupted. The runner on conn is waited for another
+    timeout seconds at most, for the query timeout to stop it; if it is still
+    busy after that, conn is retired so the pool never hands it out again.
+    """
     table_name = config['name']
 
     if 'custom_tests' not in config:
         return
 
-    report['custom_tests']['success'][table_name] = []
-    
-    for func_path in config['custom_tests']:
+    timeout = config.get('custom_test_timeout', timeout)
+    func_paths = list(dict.fromkeys(config['custom_tests']))
+
+    successes = report['custom_tests']['success'][table_name] = []
+    failures = report['custom_tests']['failure'][table_name] = []
+    timings = report['custom_tests'].setdefault('timings', {})[table_name] = {}
+
+    pending = queue.Queue()
+    for func_path in func_paths:
+        pending.put(func_path)
+
+    done = threading.Condition()
+    started = {}
+    overdue = set()
+
+    def record(func_path, elapsed, error=None):
+        # Called with done held
+        if func_path in timings:
+            return
+        started.pop(func_path, None)
+        timings[func_path] = round(elapsed, 3)
+        if error is None:
+            logger.success(f'Test "{func_path}" PASSED for table {table_name}! ({elapsed:.2f}s)')
+            successes.append(func_path)
+        else:
+            logger.error(f'Test "{func_path}" FAILED for table {table_name}! {error}')
+            failures.append(func_path)
+        done.notify_all()
+
+    def runner(test_conn):
+        while True:
+            try:
+                func_path = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            with done:
+                started[func_path] = start
+                done.notify_all()
+            error = None
+            try:
+                _run_custom_test(report, test_conn, table_name, func_path, timeout)
+            except TestFailedException as e:
+                error = e
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            with done:
+                overdue.discard(func_path)
+                record(func_path, time.perf_counter() - start, error)
+
+    def pooled_runner(test_conn):
+        try:
+            runner(test_conn)
+        finally:
+            pool.checkin(test_conn)
+
+    pool = pool or get_pool()
+    borrowed = []
+    while len(borrowed) < min(max_workers or 1, len(func_paths)) - 1:
+        try:
+            borrowed.append(pool.checkout(timeout=0))
+        except Exception:
+            break
+
+    executor = ThreadPoolExecutor(max_workers=len(borrowed) + 1, thread_name_prefix=f'tests-{table_name}')
+    try:
+        own = executor.submit(runner, conn)
+        for test_conn in borrowed:
+            executor.submit(pooled_runner, test_conn)
+
+        with done:
+            while True:
+                wait = None
+                if timeout is not None:
+                    now = time.perf_counter()
+                    for func_path, start in list(started.items()):
+                        if now - start >= timeout:
+                            record(func_path, now - start, f'Timed out after {timeout}s')
+                            overdue.add(func_path)
+                    if len(overdue) > len(borrowed):
+                        # Every runner is stuck in an overdue test, nothing else gets to run
+                        while True:
+                            try:
+                                func_path = pending.get_nowait()
+                            except queue.Empty:
+                                break
+                            record(func_path, 0, 'Not run, every test connection is busy with a timed out test')
+                    if started:
+                        wait = max(0, min(started.values()) + timeout - now)
+                if len(timings) == len(func_paths):
+                    break
+                done.wait(wait)
+
         try:
-            test = load_function(func_path)
-            test(report, conn, table_name)
-            logger.success(f'Test "{func_path}" PASSED for table {table_name}!')
-            report['custom_tests']['success'][table_name].append(func_path)
-        except TestFailedException as e:
-            logger.error(f'Test "{func_path}" FAILED for table {table_name}!')
-            report['custom_tests']['failure'][table_name].append(func_path)
\ No newline at end of file
+            own.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.error(
+                f'A timed out custom test of table {table_name} is still running on its connection, '
+                f'which is retired'
+            )
+            pool.retire(conn)
+    finally:
+        executor.shutdown(wait=False)